@@ -0,0 +1,150 @@
+"""
+BENCHMARK - start-up time, data prep speed and simulated campaigns on the fake backend
+
+Runs fully offline: no Chrome, no network. Campaigns use a virtual clock,
+so "simulated sends per hour" reflects backend latency + pacing policy,
+while the wall-clock column shows the cost of our own Python code.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --prep-rows 1000 100000 --campaign-rows 1000 --failure-rate 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from whatsapp_automation import WhatsAppAutomation
+from whatsapp_backend import FakeBackend, VirtualClock
+from whatsapp_contacts import normalize_phones
+from whatsapp_startup import import_profile
+from whatsapp_template import MessageTemplate
+
+TEMPLATE = (
+    "Hello {Name},\n"
+    "Your order {Order} ships to {City} on {Date}.\n"
+    "Reply to {Contact} if anything is wrong.\n"
+    "Thank You 🙏"
+)
+
+
+def make_contacts(rows, seed=0, duplicate_rate=0.02, bad_rate=0.01):
+    """Synthetic contact sheet - float phone column like pandas reads from Excel"""
+    rng = np.random.default_rng(seed)
+    phones = 3000000000 + rng.choice(999999999, size=rows, replace=False).astype(np.float64)
+    duplicates = rng.random(rows) < duplicate_rate
+    phones[duplicates] = phones[0]
+    phones[rng.random(rows) < bad_rate] = 12345
+    return pd.DataFrame({
+        'Name': [f"Customer {i}" for i in range(rows)],
+        'Contact': phones,
+        'City': rng.choice(["Karachi", "Lahore", "Islamabad", "Quetta"], size=rows),
+        'Order': rng.integers(100000, 999999, size=rows),
+        'Date': "2026-01-01",
+    })
+
+
+def bench_prepare(rows):
+    """Rows/sec for phone normalization + template rendering"""
+    df = make_contacts(rows)
+    start = time.perf_counter()
+    contacts = normalize_phones(df['Contact'], "+92")
+    df['Contact'] = contacts['raw']
+    template = MessageTemplate(TEMPLATE, df.columns, ['Name', 'City', 'Order', 'Date'], 'Contact')
+    template.render_frame(df)
+    elapsed = time.perf_counter() - start
+    return rows / elapsed, elapsed
+
+
+def bench_campaign(rows, work_dir, pacing, failure_rate, invalid_rate, heap_growth=0.0):
+    """Run a whole campaign against FakeBackend on a virtual clock"""
+    file_path = os.path.join(work_dir, f"contacts_{rows}.xlsx")
+    if not os.path.exists(file_path):
+        make_contacts(rows).to_excel(file_path, index=False)
+
+    clock = VirtualClock()
+    backend = FakeBackend(seed=1, sleep=clock.sleep, invalid_rate=invalid_rate, heap_growth_mb=heap_growth,
+                         failure_rates={step: failure_rate for step in ('navigation', 'confirm')})
+    config = {
+        'backend': 'fake',
+        'campaign': f"bench-{rows}-{time.time_ns()}",
+        'file_path': file_path,
+        'phone_column': 'Contact',
+        'country_code': '+92',
+        'selected_vars': ['Name', 'City', 'Order', 'Date'],
+        'message_template': TEMPLATE,
+        'output_dir': work_dir,
+        'invalid_cache_days': 0,
+        'pacing': pacing,
+        'retry': {'base_delay': 30},
+    }
+
+    automation = WhatsAppAutomation(config, backend=backend, clock=clock.time, sleep=clock.sleep)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok, message = automation.run()
+    wall = time.perf_counter() - start
+
+    simulated_hours = clock.now / 3600.0
+    sent = len(backend.sent)
+    return {
+        'ok': ok,
+        'sent': sent,
+        'simulated_hours': simulated_hours,
+        'sends_per_hour': sent / simulated_hours if simulated_hours else 0,
+        'wall_seconds': wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for WhatsApp automation")
+    parser.add_argument("--prep-rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--campaign-rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--failure-rate", type=float, default=0.02,
+                        help="injected failure probability for navigation and confirm")
+    parser.add_argument("--invalid-rate", type=float, default=0.05,
+                        help="share of numbers the fake reports as not on WhatsApp")
+    parser.add_argument("--heap-growth", type=float, default=0.0,
+                        help="simulated browser memory leak per send in MB (exercises the watchdog)")
+    args = parser.parse_args()
+
+    print("\nSTARTUP (cold import, fresh interpreter)")
+    print("-" * 50)
+    print(f"{'module':<24}{'import ms':>10}  heavy modules")
+    for module in ('whatsapp_automation', 'whatsapp_gui'):
+        profile = import_profile(module)
+        note = "import failed" if profile['error'] else ", ".join(profile['heavy']) or "-"
+        print(f"{module:<24}{profile['total_ms']:>10.0f}  {note}")
+
+    print("\nDATA PREP (normalize + render)")
+    print("-" * 50)
+    print(f"{'rows':>10}{'seconds':>12}{'rows/sec':>16}")
+    for rows in args.prep_rows:
+        rate, elapsed = bench_prepare(rows)
+        print(f"{rows:>10}{elapsed:>12.3f}{rate:>16,.0f}")
+
+    policies = {
+        'default pacing': None,
+        'no pacing': {'min_delay': 0, 'max_delay': 0},
+    }
+    print("\nSIMULATED CAMPAIGNS (fake backend, virtual clock)")
+    print("-" * 78)
+    print(f"{'rows':>8}  {'policy':<16}{'sent':>8}{'sim hours':>12}{'sends/hour':>13}{'wall s':>10}{'rows/s':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in args.campaign_rows:
+            for label, pacing in policies.items():
+                result = bench_campaign(rows, work_dir, pacing, args.failure_rate, args.invalid_rate,
+                                        args.heap_growth)
+                print(f"{rows:>8}  {label:<16}{result['sent']:>8}{result['simulated_hours']:>12.2f}"
+                      f"{result['sends_per_hour']:>13.1f}{result['wall_seconds']:>10.2f}"
+                      f"{rows / result['wall_seconds']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+OFFLINE TESTS - campaigns on the fake backend with a virtual clock (no Chrome)
+
+Run with: python -m pytest -q   (or python -m unittest test_offline)
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from statistics import median
+from unittest import mock
+
+import pandas as pd
+
+from whatsapp_automation import WhatsAppAutomation
+from whatsapp_backend import FakeBackend, VirtualClock
+import whatsapp_contacts
+from whatsapp_contacts import (PHONE_DUPLICATE, PHONE_EMPTY, PHONE_INVALID, PHONE_OK, ContactCache,
+                               cell_text, normalize_phones)
+from whatsapp_journal import STATUS_FAILED, STATUS_INVALID, STATUS_SENDING, STATUS_UNCONFIRMED
+from whatsapp_metrics import Metrics
+from whatsapp_pipeline import PrefetchQueue
+from whatsapp_progress import COMMAND_CANCEL, CampaignControl
+from whatsapp_scheduler import SendScheduler
+from whatsapp_template import MessageTemplate
+from whatsapp_watchdog import Watchdog
+
+PHONES = ["3001234501", "3001234502", "3001234503", "3001234504", "3001234505", "3001234506"]
+
+
+class CampaignTest(unittest.TestCase):
+    """Whole run() on FakeBackend - journal, retries and resume"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.dir, "contacts.csv")
+        pd.DataFrame({'Name': [f"N{i}" for i in range(len(PHONES))],
+                      'Contact': PHONES}).to_csv(self.file_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def automation(self, backend, control=None, **config):
+        clock = VirtualClock()
+        backend.sleep = clock.sleep
+        settings = {
+            'backend': 'fake',
+            'campaign': 'test',
+            'file_path': self.file_path,
+            'phone_column': 'Contact',
+            'selected_vars': ['Name'],
+            'message_template': "Hi {Name}",
+            'output_dir': self.dir,
+            'pacing': {'min_delay': 1, 'max_delay': 1},
+            'retry': {'max_attempts': 3, 'base_delay': 5, 'max_delay': 5},
+        }
+        settings.update(config)
+        return WhatsAppAutomation(settings, backend=backend, clock=clock.time,
+                                  sleep=clock.sleep, control=control)
+
+    def run_campaign(self, backend, control=None, automation=None, **config):
+        automation = automation or self.automation(backend, control, **config)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok, message = automation.run()
+        return automation, ok, message
+
+    def attempts(self, phone):
+        conn = sqlite3.connect(os.path.join(self.dir, "send_journal.db"))
+        try:
+            return [status for (status,) in conn.execute(
+                "SELECT status FROM attempts WHERE phone = ? ORDER BY id", (phone,))]
+        finally:
+            conn.close()
+
+    def test_resume_skips_contacts_already_sent(self):
+        # First run is cancelled after two sends, like the GUI's Cancel button
+        control = CampaignControl()
+        first = FakeBackend(seed=1)
+        automation = self.automation(first, control)
+
+        def cancel_after_two(event):
+            if event.get('type') == 'progress' and event.get('sent') == 2:
+                control.apply(COMMAND_CANCEL)
+
+        automation.metrics.listeners.append(cancel_after_two)
+        _, ok, _ = self.run_campaign(first, automation=automation)
+        self.assertFalse(ok)
+        self.assertEqual(len(first.sent), 2)
+
+        second = FakeBackend(seed=1)
+        automation, ok, _ = self.run_campaign(second, resume=True)
+        self.assertTrue(ok)
+        self.assertEqual(automation.skipped, 2)
+        first_phones = {phone for phone, _ in first.sent}
+        second_phones = {phone for phone, _ in second.sent}
+        self.assertFalse(first_phones & second_phones)
+        self.assertEqual(len(first_phones | second_phones), len(PHONES))
+
+    def test_invalid_numbers_are_not_retried(self):
+        backend = FakeBackend(seed=1, invalid_numbers={"+923001234503"})
+        self.run_campaign(backend)
+        self.assertEqual(self.attempts("+923001234503"), [STATUS_SENDING, STATUS_INVALID])
+        self.assertEqual(len(backend.sent), len(PHONES) - 1)
+
+    def test_unconfirmed_sends_are_not_retried(self):
+        backend = FakeBackend(seed=1, failure_rates={'confirm': 1.0})
+        automation, _, _ = self.run_campaign(backend)
+        for phone in PHONES:
+            self.assertEqual(self.attempts("+92" + phone), [STATUS_SENDING, STATUS_UNCONFIRMED])
+        self.assertEqual(backend.steps, 2 + 4 * len(PHONES))  # start, login, one pass per contact
+
+    def test_failed_sends_are_retried(self):
+        backend = FakeBackend(seed=2, failure_rates={'navigation': 0.5})
+        self.run_campaign(backend)
+        statuses = [status for phone in PHONES for status in self.attempts("+92" + phone)]
+        self.assertIn(STATUS_FAILED, statuses)
+        self.assertEqual(len(backend.sent), len(PHONES))
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_retry_backoff_doubles_up_to_max_delay(self):
+        clock = VirtualClock()
+        scheduler = SendScheduler(["a"], pacing={'min_delay': 0, 'max_delay': 0},
+                                  retry={'max_attempts': 4, 'base_delay': 30, 'max_delay': 100},
+                                  clock=clock.time, sleep=clock.sleep)
+        delays = []
+        started = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for item, attempt in scheduler:
+                started.append((attempt, clock.time()))
+                delays.append(scheduler.report(False))
+        self.assertEqual(delays, [30, 60, 100, None])
+        self.assertEqual(started, [(1, 0), (2, 30), (3, 90), (4, 190)])
+        self.assertEqual(scheduler.completed, 1)
+
+    def test_not_retryable_failure_is_final(self):
+        clock = VirtualClock()
+        scheduler = SendScheduler(["a", "b"], pacing={'min_delay': 0, 'max_delay': 0},
+                                  clock=clock.time, sleep=clock.sleep)
+        jobs = []
+        for item, attempt in scheduler:
+            jobs.append(item)
+            scheduler.report(False, retryable=False)
+        self.assertEqual(jobs, ["a", "b"])
+
+
+class WatchdogTest(unittest.TestCase):
+    """Recycle policy on send latency - sends of 1.5s that become 5s after send 30"""
+
+    def run_sends(self, backend, seconds, sends=300, switch_at=None):
+        clock = VirtualClock()
+        backend.sleep = clock.sleep
+        watchdog = Watchdog(backend, Metrics('test', clock=clock.time), {'check_every': 5})
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(sends):
+                if i == switch_at:
+                    backend.in_app_navigation = False  # in-app switch failed, reload from now on
+                watchdog.record_send(seconds(i, watchdog), True)
+                self.assertTrue(watchdog.ensure_healthy())
+        return watchdog
+
+    def test_slowdown_fixed_by_recycling(self):
+        watchdog = self.run_sends(FakeBackend(),
+                                  lambda i, watchdog: 5.0 if i >= 30 and not watchdog.recycles else 1.5)
+        self.assertEqual(len(watchdog.recycles), 1)
+        self.assertEqual(median(watchdog.baseline), 1.5)
+
+    def test_lasting_slowdown_is_recycled_once_then_rebaselined(self):
+        watchdog = self.run_sends(FakeBackend(), lambda i, watchdog: 1.5 if i < 30 else 5.0)
+        self.assertEqual(len(watchdog.recycles), 1)
+        self.assertEqual(median(watchdog.baseline), 5.0)
+
+    def test_navigation_fallback_starts_a_new_baseline(self):
+        backend = FakeBackend()
+        backend.in_app_navigation = True
+        watchdog = self.run_sends(backend, lambda i, watchdog: 1.5 if i < 30 else 5.0, switch_at=30)
+        self.assertEqual(watchdog.recycles, [])
+
+
+class ContactCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.dir, "contacts.csv")
+        pd.DataFrame({'Contact': PHONES[:3], 'Amount': [1500, None, 7]}).to_csv(
+            self.file_path, index=False)
+        self.cache = ContactCache(os.path.join(self.dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_hit_miss_and_rebuild(self):
+        digest = mock.patch.object(whatsapp_contacts, 'file_digest', wraps=whatsapp_contacts.file_digest)
+        with digest as file_digest:
+            self.assertIsNone(self.cache.lookup(self.file_path))  # miss
+            cache_file = self.cache.get(self.file_path)          # built from the hash just taken
+            self.assertEqual(file_digest.call_count, 2)
+            self.assertEqual(self.cache.get(self.file_path), cache_file)  # stat hit, no hash
+            self.assertEqual(file_digest.call_count, 2)
+
+            # Touched but identical - found again by its hash
+            os.utime(self.file_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            self.assertEqual(self.cache.lookup(self.file_path), cache_file)
+            self.assertEqual(file_digest.call_count, 3)
+
+        # Edited - a new cache file, read back as text
+        with open(self.file_path, 'a') as f:
+            f.write("3001234599,20\n")
+        self.assertIsNone(self.cache.lookup(self.file_path))
+        rebuilt = self.cache.get(self.file_path)
+        self.assertNotEqual(rebuilt, cache_file)
+        frame = pd.read_parquet(rebuilt)
+        self.assertEqual(list(frame['Contact']), PHONES[:3] + ["3001234599"])
+        self.assertEqual(list(frame['Amount'][[0, 2]]), ["1500.0", "7.0"])
+        self.assertTrue(pd.isna(frame['Amount'][1]))
+
+
+class PrefetchQueueTest(unittest.TestCase):
+
+    def test_producer_exception_reaches_the_consumer(self):
+        def contacts():
+            yield 1
+            yield 2
+            raise ValueError("bad row")
+
+        received = []
+        prefetch = PrefetchQueue(contacts(), maxsize=1).start()
+        with self.assertRaisesRegex(ValueError, "bad row"):
+            for item in prefetch:
+                received.append(item)
+        prefetch.close()
+        self.assertEqual(received, [1, 2])
+        self.assertTrue(prefetch.done)
+
+
+class PhoneTest(unittest.TestCase):
+
+    def test_floats_and_duplicates(self):
+        series = pd.Series([3001234567.0, "03001234567", "+92 300 1234567", None, "123",
+                            "3001234568.0", float("nan")], dtype=object)
+        contacts = normalize_phones(series, "+92")
+        self.assertEqual(list(contacts['phone'][:3]), ["+923001234567"] * 3)
+        self.assertEqual(contacts['phone'][5], "+923001234568")
+        self.assertEqual(list(contacts['status']),
+                         [PHONE_OK, PHONE_DUPLICATE, PHONE_DUPLICATE, PHONE_EMPTY, PHONE_INVALID,
+                          PHONE_OK, PHONE_EMPTY])
+
+    def test_country_code_without_plus_and_length(self):
+        series = pd.Series(["3001234567", "923001234568", "+92923001234569", "+9230012345"], dtype=object)
+        contacts = normalize_phones(series, "92")
+        self.assertEqual(list(contacts['phone'][:2]), ["+923001234567", "+923001234568"])
+        self.assertEqual(list(contacts['status']), [PHONE_OK, PHONE_OK, PHONE_INVALID, PHONE_INVALID])
+        with self.assertRaises(ValueError):
+            normalize_phones(series, "+9a")
+
+    def test_missing_cells_stay_missing(self):
+        self.assertIsNone(cell_text(float("nan")))
+        self.assertIsNone(cell_text(pd.NA))
+        self.assertEqual(cell_text(3001234567.0), "3001234567")
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_warnings(self):
+        template = MessageTemplate("Hi {Name} {City} {Order}", ["Name", "Contact", "Order", "Extra"],
+                                   ["Name", "Extra"], "Contact")
+        self.assertEqual(template.unknown, ["City"])
+        self.assertEqual(template.unselected, ["Order"])
+        self.assertEqual(template.unused, ["Extra"])
+        self.assertEqual(len(template.warnings()), 3)
+
+    def test_unselected_placeholders_are_sent_as_written(self):
+        template = MessageTemplate("Hi {Name}, order {Order}", ["Name", "Order"], ["Name"])
+        frame = pd.DataFrame({'Name': ["Ann", None], 'Order': ["1", "2"]})
+        self.assertEqual(list(template.render_frame(frame)), ["Hi Ann, order {Order}", "Hi , order {Order}"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,342 +2,844 @@
 WHATSAPP AUTOMATION - SIMPLE & RELIABLE
 """
 
+import argparse
 import json
 import os
 import sys
+import threading
 import time
 import traceback
 from datetime import datetime
-import re
-import random
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-import pandas as pd
 
-print("=" * 70)
-print("WHATSAPP AUTOMATION")
-print("=" * 70)
-print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-print("=" * 70)
+# Importing this module stays cheap: pandas and selenium load only once
+# contacts are read or Chrome starts (see --profile-startup)
+from whatsapp_backend import SendNotConfirmed, create_backend
+from whatsapp_contacts import (PHONE_DUPLICATE, PHONE_KNOWN_INVALID, PHONE_OK, ContactCache,
+                               PreflightReport, estimate_rows, iter_contact_chunks, normalize_country_code,
+                               normalize_phones, read_columns)
+from whatsapp_journal import (STATUS_FAILED, STATUS_INVALID, STATUS_SENDING, STATUS_SENT,
+                              STATUS_UNCONFIRMED, SendJournal, campaign_id)
+from whatsapp_diagnostics import DiagnosticsStore
+from whatsapp_metrics import SEND_STAGES, Metrics
+from whatsapp_pipeline import DEFAULT_PREFETCH, PrefetchQueue
+from whatsapp_progress import CampaignControl, ProgressClient
+from whatsapp_scheduler import SendScheduler
+from whatsapp_startup import import_profile, print_import_profile
+from whatsapp_template import MessageTemplate
+from whatsapp_watchdog import Watchdog
 
 
 class WhatsAppAutomation:
-    def __init__(self, config):
+    def __init__(self, config, backend=None, clock=time.time, sleep=time.sleep, control=None):
         self.config = config
-        self.driver = None
+        # Browser access goes through a backend (Selenium, or the offline fake)
+        self.backend = backend or create_backend(config, sleep=sleep)
+        self.clock = clock
+        self.sleep = sleep
+        # Pause / cancel requests (from the GUI over the progress channel)
+        self.control = control or CampaignControl()
         self.failed_messages = []
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.log_file = os.path.join(script_dir, "failed_messages.log")
-        
-    def setup_driver(self):
-        """Setup Chrome - Simple & Clean"""
-        print("\n[1/4] SETTING UP CHROME")
-        print("-" * 40)
-        
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        
-        try:
-            print("Opening Chrome...")
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.maximize_window()
-            print("✓ Chrome ready")
-            return True
-        except Exception as e:
-            print(f"✗ Chrome error: {str(e)[:200]}")
-            return False
-    
-    def wait_for_login(self):
-        """Wait for QR scan - FIXED 60 SECOND WAIT"""
-        print(f"\n[2/4] WHATSAPP WEB")
-        print("-" * 40)
-        
-        try:
-            print("Loading WhatsApp Web...")
-            self.driver.get("https://web.whatsapp.com/")
-            time.sleep(5)  # Initial wait for page load
-            
-            print("\n" + "=" * 70)
-            print("SCAN QR CODE")
-            print("=" * 70)
-            print("1. Look at Chrome window")
-            print("2. Scan QR code with your phone")
-            print("3. You have 60 seconds to scan")
-            print("=" * 70)
-            
-            # FIXED: Always wait 60 seconds for QR scan
-            wait_time = 60
-            print(f"\n⏳ Waiting {wait_time} seconds for QR scan...")
-            
-            start_time = time.time()
-            qr_scanned = False
-            
-            while time.time() - start_time < wait_time:
-                try:
-                    # Check if already logged in (chat list exists)
-                    chat_elements = self.driver.find_elements(By.CSS_SELECTOR, 
-                        "div[role='list'], div[data-testid='chat-list'], div[class*='chat']")
-                    
-                    if chat_elements:
-                        print("✓ WhatsApp loaded successfully!")
-                        qr_scanned = True
-                        break
-                    
-                    # Check if QR code is still present
-                    qr_elements = self.driver.find_elements(By.CSS_SELECTOR, "canvas")
-                    if not qr_elements:
-                        print("✓ QR code disappeared (scanned)")
-                        qr_scanned = True
-                        break
-                        
-                except:
-                    pass
-                
-                # Show progress every 15 seconds
-                elapsed = int(time.time() - start_time)
-                if elapsed % 15 == 0:
-                    print(f"  {elapsed}/{wait_time} seconds...")
-                
-                time.sleep(2)  # Check every 2 seconds
-            
-            if qr_scanned:
-                print("✓ QR scanned successfully!")
-                time.sleep(5)  # Extra wait for WhatsApp to fully load
-                return True
-            else:
-                print(f"⚠️ {wait_time} seconds elapsed - QR not detected")
-                print("⚠️ Continuing anyway - please ensure WhatsApp is loaded")
-                time.sleep(10)  # Extra wait
-                return True  # Continue anyway
-                
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
-            print("⚠️ Continuing anyway...")
-            time.sleep(10)
-            return True  # Continue anyway
-    
-    def format_phone(self, phone):
-        """Format phone number"""
-        phone = str(phone).strip()
-        phone = re.sub(r'[^\d+]', '', phone)
-        country_code = self.config.get('country_code', '+92')
+        self.failed_lock = threading.Lock()   # the contact producer logs failures too
+        self.last_error = ""
+        self.prefetch = None
+        # Contacts are read from here - the file itself or its parsed cache copy
+        self.source_path = config.get('file_path')
+        # Logs, journal, reports and metrics go next to the script unless output_dir is set
+        output_dir = config.get('output_dir') or os.path.dirname(os.path.abspath(__file__))
+        self.output_dir = output_dir
+        self.log_file = os.path.join(output_dir, "failed_messages.log")
+        self.journal_file = config.get('journal') or os.path.join(output_dir, "send_journal.db")
+        self.journal = None
+        self.campaign = campaign_id(config)
+        self.report_file = os.path.join(output_dir, f"preflight_{self.campaign}.csv")
+        self.metrics_dir = config.get('metrics_dir') or os.path.join(output_dir, "metrics")
+        self.metrics = Metrics(self.campaign, os.path.join(self.metrics_dir, f"{self.campaign}.events.jsonl"),
+                               clock=clock)
+        # Failure artifacts, linked to journal entries (see capture_diagnostics)
+        diagnostics = config.get('diagnostics', {})
+        self.diagnostics = None
+        if diagnostics is not False:
+            diagnostics = diagnostics if isinstance(diagnostics, dict) else {}
+            self.diagnostics = DiagnosticsStore(diagnostics.get('dir') or os.path.join(output_dir, "diagnostics"),
+                                                diagnostics)
+        self.attempt = None          # (journal id, row, attempt) being sent
+        self.last_artifact = None
+        # Samples browser health between contacts and recycles it when it degrades
+        watchdog = config.get('watchdog', {})
+        self.watchdog = None
+        if watchdog is not False:
+            self.watchdog = Watchdog(self.backend, self.metrics,
+                                     watchdog if isinstance(watchdog, dict) else None)
         
-        if not phone.startswith(country_code):
-            if phone.startswith('0'):
-                phone = phone[1:]
-            phone = country_code + phone
-        return phone
-    
     def send_message(self, phone, message):
-        """Send message - FIXED to type in message box, not search box"""
+        """Send message - returns STATUS_SENT, STATUS_FAILED, STATUS_INVALID or STATUS_UNCONFIRMED"""
+        started = self.clock()
+        self.last_artifact = None
         try:
             print(f"\nSending to: {phone}")
             
-            whatsapp_url = f"https://web.whatsapp.com/send?phone={phone}"
-            self.driver.get(whatsapp_url)
-            time.sleep(5)
+            with self.metrics.stage('navigation'):
+                chat_open = self.backend.open_chat(phone)
+            if not chat_open:
+                # Terminal outcome - retrying will not make the number valid
+                self.last_error = "Phone number is not on WhatsApp"
+                if not self.backend.dismiss_dialog():
+                    # A stuck popup would make every following contact look invalid
+                    raise RuntimeError("Invalid-number popup could not be closed")
+                print(f"✗ {phone} is not on WhatsApp")
+                if self.diagnostics:
+                    self.diagnostics.record_success()
+                return STATUS_INVALID
             
             # FIX: Wait for chat to fully load and find the CORRECT message box
             print("Looking for message input box...")
             
-            # Method 1: Try to find message box by data-tab attribute
-            try:
-                # WhatsApp Web uses data-tab='10' for message input
-                message_box = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 
-                        "div[contenteditable='true'][data-tab='10'], "
-                        "div[contenteditable='true'][data-tab='9'], "
-                        "footer div[contenteditable='true']"))
-                )
-                print("✓ Found message box (data-tab selector)")
-            except:
-                # Method 2: Try to find by position (footer area)
-                try:
-                    message_box = WebDriverWait(self.driver, 15).until(
-                        EC.presence_of_element_located((By.XPATH, 
-                            "//footer//div[@contenteditable='true']"))
-                    )
-                    print("✓ Found message box (footer selector)")
-                except:
-                    # Method 3: Try your exact XPath
-                    try:
-                        message_box = WebDriverWait(self.driver, 15).until(
-                            EC.presence_of_element_located((By.XPATH, 
-                                "/html/body/div[1]/div/div/div[3]/div/div[4]/div/footer/div[1]/div/span/div/div[2]/div[1]/div[2]/div[1]/p"))
-                        )
-                        print("✓ Found message box (your XPath)")
-                    except:
-                        # Method 4: Last resort - find ALL contenteditable divs and use the last one
-                        all_editables = self.driver.find_elements(By.CSS_SELECTOR, "div[contenteditable='true']")
-                        if len(all_editables) >= 2:
-                            # Usually: [0] = search box, [1] = message box
-                            message_box = all_editables[1]
-                            print(f"✓ Found message box (index {1} of {len(all_editables)})")
-                        else:
-                            raise Exception("Could not find message input box")
-            
-            # Click and focus on the message box
-            print("Focusing on message box...")
-            message_box.click()
-            time.sleep(2)
+            with self.metrics.stage('selector'):
+                strategy, message_box = self.backend.find_compose_box()
+            print(f"✓ Found message box ({strategy} selector)")
             
-            # Clear any existing text (Ctrl+A, Delete)
-            message_box.send_keys(Keys.CONTROL + "a")
-            message_box.send_keys(Keys.DELETE)
-            time.sleep(1)
+            with self.metrics.stage('typing'):
+                self.backend.compose(message_box, message)
             
-            # Send message line by line
-            print("Typing message...")
-            lines = message.split("\n")
-            for i, line in enumerate(lines):
-                message_box.send_keys(line)
-                if i < len(lines) - 1:
-                    message_box.send_keys(Keys.SHIFT + Keys.ENTER)
-                    time.sleep(0.1)
-            
-            # Send the message
-            message_box.send_keys(Keys.ENTER)
-            time.sleep(4)
+            with self.metrics.stage('confirm'):
+                self.backend.send(message_box)
             
             print(f"✓ Message sent to {phone}")
-            return True
+            if self.diagnostics:
+                self.diagnostics.record_success()
+            return STATUS_SENT
+            
+        except SendNotConfirmed as e:
+            # ENTER was pressed - the message may be delivered, so it is never sent again
+            self.last_error = f"Not confirmed after sending: {str(e)[:160]}"
+            print(f"⚠️ Message to {phone} was sent but not confirmed - check manually")
+            self.last_artifact = self.capture_diagnostics(phone, started)
+            return STATUS_UNCONFIRMED
             
         except Exception as e:
+            # Selenium puts the readable part in .msg ("Chat did not load")
+            self.last_error = (getattr(e, 'msg', None) or str(e)).strip().split("\n")[0][:200]
             print(f"✗ Failed to send: {str(e)[:100]}")
-            
-            # Take screenshot for debugging
+            self.last_artifact = self.capture_diagnostics(phone, started)
+            return STATUS_FAILED
+    
+    def failed_before_send(self, started):
+        """True when the attempt begun at `started` failed in a stage before ENTER is pressed"""
+        failure = self.metrics.last_failure
+        if not failure or failure[1] < started:
+            return False  # no failed stage recorded - the outcome is unknown
+        before_send = SEND_STAGES[:SEND_STAGES.index('confirm')]
+        return failure[0] in before_send
+    
+    def capture_diagnostics(self, phone, started):
+        """Save a compact failure artifact for the current attempt - returns its path.
+        
+        Holds the page summary from the backend, the selectors tried and the
+        attempt's stage timings, and names the journal entry it belongs to.
+        """
+        if not self.diagnostics:
+            return None
+        plan = self.diagnostics.plan()
+        if plan is None:
+            return None
+        try:
+            width = self.diagnostics.settings['screenshot_width'] if plan == 'full' else None
+            info = self.backend.diagnose(screenshot_width=width) or {}
+            screenshot = info.pop('screenshot_b64', None)
+            journal_id, row, attempt = self.attempt or (None, None, None)
+            failure = self.metrics.last_failure
+            record = {
+                'journal_id': journal_id,
+                'campaign': self.campaign,
+                'phone': phone,
+                'row': row,
+                'attempt': attempt,
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'error': self.last_error,
+                'failed_stage': failure[0] if failure and failure[1] >= started else None,
+                'timings': {stage: round(seconds, 3)
+                            for stage, (finished, seconds) in self.metrics.last_durations.items()
+                            if stage in SEND_STAGES and finished >= started},
+            }
+            record.update(info)
+            name = f"{journal_id:08d}_{self.campaign}" if journal_id else f"{self.campaign}_{int(time.time() * 1000)}"
+            path = self.diagnostics.save(name, record, screenshot)
+            print(f"  Diagnostics saved: {os.path.basename(path)}")
+            return path
+        except Exception as e:
+            print(f"  ⚠️ Could not save diagnostics: {str(e)[:100]}")
+            return None
+    
+    def log_failure(self, phone, reason):
+        """Remember a contact that could not be sent and append it to failed_messages.log"""
+        entry = {'phone': phone, 'reason': reason, 'campaign': self.campaign,
+                 'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        with self.failed_lock:
+            self.failed_messages.append(entry)
             try:
-                safe_phone = re.sub(r'[^\d]', '', phone)[-4:]  # Last 4 digits
-                screenshot_path = os.path.join(os.path.dirname(__file__), f"error_send_{safe_phone}.png")
-                self.driver.save_screenshot(screenshot_path)
-                print(f"  Screenshot saved: {screenshot_path}")
-            except:
-                pass
-                
-            return False
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(f"{entry['time']}\t{self.campaign}\t{phone}\t{reason}\n")
+            except OSError as e:
+                print(f"  ⚠️ Could not write {self.log_file}: {e}")
     
-    def run(self):
-        """Main execution - MUST HAVE THIS METHOD"""
+    def contact_source(self, file_path):
+        """Parsed copy from the contact cache when it still matches file_path, else file_path"""
+        cache_file = self.config.get('contact_cache')
+        if not cache_file:
+            return file_path
         try:
-            if not self.setup_driver():
-                return False, "Chrome failed"
+            if ContactCache(os.path.dirname(cache_file)).lookup(file_path) == cache_file:
+                print("✓ Using parsed contacts from cache")
+                return cache_file
+            print("⚠️ Contacts cache is out of date, reading the file instead")
+        except Exception as e:
+            print(f"⚠️ Contacts cache unavailable ({e}), reading the file instead")
+        return file_path
+    
+    def compile_template(self, columns):
+        """Compile the message template once and show its problems up front"""
+        template = MessageTemplate(self.config['message_template'], columns,
+                                   self.config.get('selected_vars', []),
+                                   self.config['phone_column'])
+        for warning in template.warnings():
+            print(f"⚠️ {warning}")
+        return template
+    
+    def stream_contacts(self, template, report, scheduler, already_sent, uncertain, known_invalid):
+        """Yield (row, phone, message) for every sendable contact, chunk by chunk.
+        
+        Only the phone column and the template's variables are read. Each chunk
+        is normalized, de-duplicated (also against earlier chunks), checked
+        against the invalid-number cache (known_invalid) and rendered in one
+        vectorized pass. Runs in the producer thread - no journal access here.
+        """
+        phone_column = self.config['phone_column']
+        country_code = self.config.get('country_code', '+92')
+        seen = set()
+        
+        # As text, like the contact cache and the GUI preview - a number column
+        # must render the same whichever path or chunk a row comes through
+        chunks = iter_contact_chunks(self.source_path, template.fields, phone_column, as_text=True)
+        while True:
+            with self.metrics.stage('workbook_load'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                print(f"  ✓ All {self.rows_read} rows prepared: {self.sendable} to send, "
+                      f"{report.not_sendable()} not sendable")
+                return
+            
+            first_row = self.rows_read + 1
+            with self.metrics.stage('prepare', rows=len(chunk)):
+                contacts = normalize_phones(chunk[phone_column], country_code)
+                ok = contacts['status'] == PHONE_OK
+                contacts.loc[ok & contacts['phone'].isin(seen), 'status'] = PHONE_DUPLICATE
+                ok = contacts['status'] == PHONE_OK
+                contacts.loc[ok & contacts['phone'].isin(known_invalid), 'status'] = PHONE_KNOWN_INVALID
+                
+                chunk[phone_column] = contacts['raw']
+                contacts['message'] = template.render_frame(chunk)
+                contacts['row'] = range(first_row, first_row + len(chunk))
+                report.add(contacts, first_row)
+                
+                sendable = contacts[contacts['status'] == PHONE_OK]
+                seen.update(sendable['phone'])
             
-            if not self.wait_for_login():
-                return False, "Login failed"
+            self.rows_read += len(chunk)
+            self.sendable += len(sendable)
+            not_sendable = len(chunk) - len(sendable)
+            if not_sendable:
+                print(f"  ⚠️ Rows {first_row}-{self.rows_read}: {not_sendable} will not be sent "
+                      f"(see {os.path.basename(self.report_file)})")
+            scheduler.exclude(not_sendable)
             
-            print(f"\n[3/4] READING DATA")
+            for contact_num, phone, message in zip(sendable['row'], sendable['phone'],
+                                                   sendable['message']):
+                # Resume: skip contacts the journal already has an outcome for
+                if phone in already_sent:
+                    self.skipped += 1
+                    scheduler.exclude(1)
+                    continue
+                if phone in uncertain:
+                    # Last run died mid-send or saw no tick - never risk a double send
+                    print(f"  ⚠️ {phone} may already have been sent last run - skipping, check manually")
+                    self.log_failure(phone, "Outcome unknown (unconfirmed last run)")
+                    self.skipped += 1
+                    scheduler.exclude(1)
+                    continue
+                yield contact_num, phone, message
+    
+    def start_session(self):
+        """Start the browser and wait for WhatsApp login - (ok, message)"""
+        with self.metrics.stage('driver_setup'):
+            driver_ready = self.backend.start()
+        if not driver_ready:
+            return False, "Chrome failed"
+        
+        with self.metrics.stage('login'):
+            logged_in = self.backend.wait_for_login()
+        if not logged_in:
+            return False, "Login failed"
+        return True, ""
+    
+    def run(self, keep_session=False):
+        """Main execution - MUST HAVE THIS METHOD
+        
+        keep_session=True sends on a browser that is already started and logged
+        in (see start_session) and leaves it open afterwards - used by batch mode.
+        """
+        report = None
+        try:
+            self.journal = SendJournal(self.journal_file)
+            resume = bool(self.config.get('resume'))
+            already_sent = self.journal.confirmed(self.campaign) if resume else set()
+            uncertain = self.journal.in_flight(self.campaign) if resume else set()
+            if resume:
+                print(f"Resuming campaign {self.campaign}: {len(already_sent)} already sent, "
+                      f"{len(uncertain)} possibly delivered but unconfirmed")
+            
+            # Header and template are checked before Chrome starts; the rows
+            # themselves are streamed while sending
+            print(f"\n[1/4] READING DATA")
             print("-" * 40)
             
             file_path = self.config['file_path']
             if not os.path.exists(file_path):
                 return False, f"File not found: {file_path}"
             
-            df = pd.read_excel(file_path)
             phone_column = self.config['phone_column']
+            with self.metrics.stage('workbook_load'):
+                self.source_path = self.contact_source(file_path)
+                columns = read_columns(self.source_path)
+                estimate = estimate_rows(self.source_path)
             
-            if phone_column not in df.columns:
+            if phone_column not in columns:
                 return False, f"Column '{phone_column}' not found"
             
-            total = len(df)
+            template = self.compile_template(columns)
+            total_label = estimate if estimate is not None else "?"
+            print(f"✓ {total_label} rows, reading {len(template.fields) + 1} of {len(columns)} columns")
+            
             success = 0
+            failed = 0
+            unconfirmed = 0
+            cancelled = False
+            self.rows_read = 0
+            self.sendable = 0
+            self.skipped = 0
             
-            print(f"✓ Found {total} contacts")
+            cache_days = self.config.get('invalid_cache_days', 30)
+            # Numbers found not to be on WhatsApp in earlier campaigns
+            known_invalid = self.journal.known_invalid(cache_days) if cache_days else set()
+            report = PreflightReport(self.report_file)
+            scheduler = SendScheduler([], total=estimate,
+                                      pacing=self.config.get('pacing'),
+                                      retry=self.config.get('retry'),
+                                      clock=self.clock, sleep=self.sleep)
+            # Contacts are read, validated and rendered in a producer thread that
+            # starts now - it overlaps Chrome startup and login, stays ahead of
+            # the browser and reports bad rows long before they are reached
+            self.prefetch = PrefetchQueue(
+                self.stream_contacts(template, report, scheduler, already_sent, uncertain, known_invalid),
+                maxsize=self.config.get('prefetch', DEFAULT_PREFETCH)).start()
+            scheduler.items = iter(self.prefetch)
+            
+            if not keep_session:
+                session_ok, session_message = self.start_session()
+                if not session_ok:
+                    return False, session_message
             
             print(f"\n[4/4] SENDING MESSAGES")
             print("-" * 40)
             
-            for i, row in df.iterrows():
-                contact_num = i + 1
-                print(f"\n{contact_num}/{total}:")
-                
-                raw_phone = row[phone_column]
-                if pd.isna(raw_phone):
-                    print("  ✗ Empty phone")
-                    continue
+            projected = scheduler.projected_seconds()
+            if projected is not None:
+                print(f"Projected time for up to {estimate} messages: ~{projected / 60:.0f} min")
+            
+            for (contact_num, phone, message), attempt in scheduler:
+                if self.control.paused():
+                    print("\n⏸ Paused - waiting for resume...")
+                    self.metrics.event('state', state='paused')
+                    self.control.wait_while_paused()
+                    self.metrics.event('state', state='running')
+                if self.control.cancelled():
+                    cancelled = True
+                    break
+                if self.watchdog and not self.watchdog.ensure_healthy():
+                    return False, "Browser could not be recovered - continue with --resume"
                 
-                phone = self.format_phone(raw_phone)
+                retry_note = f" (attempt {attempt})" if attempt > 1 else ""
+                print(f"\n{contact_num}/{total_label}:{retry_note}")
                 print(f"  Phone: {phone}")
                 
-                message = self.config['message_template']
-                selected_vars = self.config.get('selected_vars', [])
-                
-                for var in selected_vars:
-                    if var in df.columns and var != phone_column:
-                        value = str(row[var]) if not pd.isna(row[var]) else ""
-                        message = message.replace(f"{{{var}}}", value)
-                
-                message = message.replace(f"{{{phone_column}}}", str(raw_phone))
-                
-                # Send with retry
-                for attempt in range(3):
-                    if self.send_message(phone, message):
-                        success += 1
+                journal_id = self.journal.record(self.campaign, phone, STATUS_SENDING,
+                                                 row=contact_num, attempt=attempt)
+                self.attempt = (journal_id, contact_num, attempt)
+                send_started = self.clock()
+                result = self.send_message(phone, message)
+                if result == STATUS_FAILED and self.watchdog and self.watchdog.recover_if_lost():
+                    if self.failed_before_send(send_started):
+                        # The browser died under this contact, not because of it - send it again
+                        print(f"  ↻ Resending {phone} on the recovered browser")
+                        send_started = self.clock()
+                        result = self.send_message(phone, message)
+                    else:
+                        # It may have died after ENTER - a resend could deliver the message twice
+                        print(f"  ⚠️ Browser was lost while sending to {phone} - not resending")
+                        self.last_error = f"Browser lost while sending, outcome unknown: {self.last_error}"
+                        result = STATUS_UNCONFIRMED
+                if self.watchdog:
+                    self.watchdog.record_send(self.clock() - send_started,
+                                              result not in (STATUS_FAILED, STATUS_UNCONFIRMED))
+                self.metrics.outcome(result, phone, "" if result == STATUS_SENT else self.last_error)
+                if result == STATUS_SENT:
+                    self.journal.record(self.campaign, phone, STATUS_SENT,
+                                        row=contact_num, attempt=attempt)
+                    scheduler.report(True)
+                    success += 1
+                    eta = scheduler.eta()
+                    if eta is None:
                         print(f"  ✓ Sent")
-                        break
-                    elif attempt < 2:
-                        print(f"  ↻ Retry {attempt+1}/3")
-                        time.sleep(5)
                     else:
-                        print(f"  ✗ Failed")
+                        print(f"  ✓ Sent - {scheduler.remaining()} left, "
+                              f"ETA {datetime.fromtimestamp(eta).strftime('%H:%M')}")
+                    self.report_progress(scheduler, contact_num, phone, result, success, failed)
+                    continue
                 
-                if contact_num < total:
-                    delay = random.randint(10, 25)
-                    print(f"  ⏳ Waiting {delay}s...")
-                    time.sleep(delay)
+                self.journal.record(self.campaign, phone, result, row=contact_num,
+                                    attempt=attempt, detail=self.last_error,
+                                    artifact=self.last_artifact)
+                if result == STATUS_UNCONFIRMED:
+                    # Probably went out: paced like a send, never queued again
+                    scheduler.report(True)
+                    print(f"  ⚠️ Unconfirmed - not retrying, check manually")
+                    self.log_failure(phone, f"Unconfirmed - check manually: {self.last_error}")
+                    unconfirmed += 1
+                    failed += 1
+                    self.report_progress(scheduler, contact_num, phone, result, success, failed)
+                    continue
+                # Not-on-WhatsApp is terminal, anything else goes to the retry queue
+                retry_in = scheduler.report(False, retryable=result != STATUS_INVALID)
+                if result == STATUS_INVALID:
+                    print(f"  ✗ Not on WhatsApp - not retrying")
+                    self.journal.mark_invalid(phone)
+                    self.log_failure(phone, self.last_error)
+                    failed += 1
+                elif retry_in is not None:
+                    print(f"  ↻ Retry queued in {retry_in:.0f}s")
+                else:
+                    print(f"  ✗ Failed")
+                    self.log_failure(phone, self.last_error)
+                    failed += 1
+                self.report_progress(scheduler, contact_num, phone, result, success, failed)
+            
+            if not keep_session:
+                self.backend.stop()
+            self.prefetch.close()
             
-            self.driver.quit()
+            total = self.rows_read
+            not_sendable = report.not_sendable()
             
             print("\n" + "=" * 70)
             print("COMPLETE")
             print("=" * 70)
             print(f"Total: {total}")
             print(f"Success: {success}")
-            print(f"Failed: {total - success}")
+            if self.skipped:
+                print(f"Skipped (resume): {self.skipped}")
+            if not_sendable:
+                details = ", ".join(f"{count} {status}" for status, count in report.counts.items()
+                                    if status != PHONE_OK)
+                print(f"Not sendable: {not_sendable} ({details}) - see {self.report_file}")
+            print(f"Failed: {failed}")
+            if unconfirmed:
+                print(f"Unconfirmed (sent, no tick seen - check manually, never resent): {unconfirmed}")
+            if cancelled:
+                print(f"Cancelled: remaining contacts were not attempted (run again with --resume)")
+            if self.failed_messages:
+                print(f"Failed numbers logged to: {self.log_file}")
+                if self.diagnostics:
+                    for line in self.diagnostics.report():
+                        print(line)
+            for line in self.backend.report():
+                print(line)
+            if self.watchdog:
+                for line in self.watchdog.report():
+                    print(line)
+            pipeline = self.prefetch.stats()
+            self.metrics.event('pipeline', **pipeline)
+            print(f"Contact pipeline: browser waited for data {pipeline['consumer_waits']} times "
+                  f"({pipeline['consumer_wait_seconds']:.1f}s)")
+            self.print_stage_summary()
             
+            if cancelled:
+                return False, f"Cancelled after sending {success}"
+            if not self.sendable:
+                return False, "No valid phone numbers to send to"
             return True, f"Sent {success}/{total}"
             
         except Exception as e:
             print(f"\n✗ Error: {str(e)}")
             traceback.print_exc()
-            
-            if self.driver:
-                try:
-                    self.driver.quit()
-                except:
-                    pass
-            
             return False, str(e)
+        
+        finally:
+            if not keep_session:
+                self.backend.stop()
+            if self.prefetch:
+                self.prefetch.close()
+            if report:
+                report.close()
+            if self.journal:
+                self.journal.close()
+            self.export_metrics()
+    
+    def report_progress(self, scheduler, contact_num, phone, status, sent, failed):
+        """Progress event after each attempt - what the GUI dashboard shows"""
+        self.metrics.event('progress', row=contact_num, phone=phone, status=status,
+                           sent=sent, failed=failed, skipped=self.skipped,
+                           done=scheduler.completed, total=scheduler.total,
+                           retry_queue=len(scheduler.retry_queue),
+                           queue_depth=self.prefetch.depth(),
+                           producer_done=self.prefetch.done,
+                           consumer_waits=self.prefetch.starved,
+                           sends_per_hour=round(self.metrics.sends_per_hour(), 1),
+                           eta=scheduler.eta())
+    
+    def export_metrics(self):
+        """Write the campaign summary JSON and its Prometheus textfile.
+        
+        One .prom file per campaign, so campaigns of a batch or --watch run
+        do not overwrite each other (the textfile collector reads them all).
+        """
+        try:
+            summary_file = os.path.join(self.metrics_dir, f"{self.campaign}.summary.json")
+            self.metrics.write_summary(summary_file)
+            prom_dir = self.config.get('prometheus_dir') or self.metrics_dir
+            self.metrics.write_prometheus(os.path.join(prom_dir, f"{self.campaign}.prom"))
+            print(f"Metrics written to: {self.metrics_dir}")
+        except OSError as e:
+            print(f"⚠️ Could not write metrics: {e}")
+        finally:
+            self.metrics.close()
+    
+    def print_stage_summary(self):
+        """Stage timing table (seconds) for the console"""
+        summary = self.metrics.summary()
+        print(f"Sends/hour: {summary['sends_per_hour']}")
+        print(f"\n{'Stage':<14}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, stats in summary['stages'].items():
+            print(f"{name:<14}{stats['count']:>7}{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}")
+        for reason, count in summary['failure_reasons'].items():
+            print(f"  {count} x {reason}")
+
+
+class BatchRunner:
+    """Runs campaign configs one after another on one logged-in browser session.
+    
+    Browser settings (backend, profile, timeouts) come from the first campaign's
+    config. The session is only restarted when the browser has died.
+    """
+    
+    def __init__(self, clock=time.time, sleep=time.sleep, control=None, listeners=()):
+        self.backend = None
+        self.session_ready = False
+        self.clock = clock
+        self.sleep = sleep
+        self.control = control or CampaignControl()
+        self.listeners = list(listeners)
+        self.results = []
+    
+    def run_campaign(self, config, label=""):
+        """Run one campaign and return its result dict"""
+        if self.backend is None:
+            self.backend = create_backend(config, sleep=self.sleep)
+        automation = WhatsAppAutomation(config, backend=self.backend, clock=self.clock,
+                                        sleep=self.sleep, control=self.control)
+        automation.metrics.listeners.extend(self.listeners)
+        started = self.clock()
+        print("\n" + "#" * 70)
+        print(f"CAMPAIGN {automation.campaign} ({label or config.get('file_path')})")
+        print("#" * 70)
+        
+        if self.session_ready and not self.backend.is_alive():
+            print("⚠️ Browser session was lost - starting a new one")
+            self.backend.stop()
+            self.session_ready = False
+        
+        if self.session_ready:
+            print("✓ Reusing the logged-in browser session")
+        else:
+            self.session_ready, message = automation.start_session()
+        if self.session_ready:
+            ok, message = automation.run(keep_session=True)
+        else:
+            ok = False
+            automation.export_metrics()
+        
+        result = {
+            'campaign': automation.campaign,
+            'config': label,
+            'ok': ok,
+            'message': message,
+            'outcomes': dict(automation.metrics.outcomes),
+            'elapsed_seconds': round(self.clock() - started, 1),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.record(result, automation.output_dir)
+        return result
+    
+    def record(self, result, output_dir):
+        """Keep a result and append it to batch_results.jsonl"""
+        self.results.append(result)
+        try:
+            with open(os.path.join(output_dir, "batch_results.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write batch results: {e}")
+    
+    def run_files(self, config_files, resume=False):
+        """Batch mode - every config file in order; one broken config never stops the rest"""
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        for config_file in config_files:
+            if self.control.cancelled():
+                break
+            label = os.path.basename(config_file)
+            try:
+                config = load_config(config_file, resume)
+            except (OSError, ValueError) as e:
+                print(f"✗ {config_file}: {e}")
+                self.record({'config': label, 'ok': False, 'message': f"Invalid config: {e}"}, script_dir)
+                continue
+            try:
+                self.run_campaign(config, label=label)
+            except Exception as e:
+                # e.g. an unknown backend or an output folder that cannot be created
+                print(f"\n✗ {config_file}: {e}")
+                traceback.print_exc()
+                self.record({'campaign': campaign_id(config), 'config': label, 'ok': False,
+                             'message': f"Campaign error: {e}"},
+                            config.get('output_dir') or script_dir)
+        return self.results
+    
+    def watch(self, queue_dir, poll_seconds=5, resume=False):
+        """Daemon mode - run every *.json that appears in queue_dir, in name order.
+        
+        Finished configs move to queue_dir/done or queue_dir/failed together with
+        a <name>.result.json. Write new configs under another name first and
+        rename them to .json, so a half-written file is never picked up.
+        """
+        done_dir = os.path.join(queue_dir, "done")
+        failed_dir = os.path.join(queue_dir, "failed")
+        os.makedirs(done_dir, exist_ok=True)
+        os.makedirs(failed_dir, exist_ok=True)
+        print(f"\nWatching {queue_dir} for campaign configs (Ctrl+C to stop)...")
+        
+        while not self.control.cancelled():
+            pending = sorted(name for name in os.listdir(queue_dir)
+                             if name.endswith('.json') and os.path.isfile(os.path.join(queue_dir, name)))
+            if not pending:
+                self.sleep(poll_seconds)
+                continue
+            
+            name = pending[0]
+            config_file = os.path.join(queue_dir, name)
+            self.run_files([config_file], resume)
+            result = self.results[-1]
+            target_dir = done_dir if result['ok'] else failed_dir
+            os.replace(config_file, os.path.join(target_dir, name))
+            with open(os.path.join(target_dir, name[:-len('.json')] + ".result.json"), 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=4)
+        return self.results
+    
+    def print_summary(self):
+        print("\n" + "=" * 70)
+        print("BATCH SUMMARY")
+        print("=" * 70)
+        print(f"{'campaign':<16}{'sent':>6}{'failed':>8}{'invalid':>9}{'minutes':>9}  result")
+        for result in self.results:
+            outcomes = result.get('outcomes', {})
+            print(f"{str(result.get('campaign', '-')):<16}{outcomes.get(STATUS_SENT, 0):>6}"
+                  f"{outcomes.get(STATUS_FAILED, 0):>8}{outcomes.get(STATUS_INVALID, 0):>9}"
+                  f"{result.get('elapsed_seconds', 0) / 60:>9.1f}  "
+                  f"{'✓' if result['ok'] else '✗'} {result['message']}")
+    
+    def close(self):
+        if self.backend:
+            self.backend.stop()
+
+
+def load_config(config_file, resume=False):
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object")
+    if resume:
+        config['resume'] = True
+    return config
+
+
+def print_config(config):
+    print(f"\nConfiguration:")
+    print(f"- File: {config.get('file_path')}")
+    print(f"- Phone column: {config.get('phone_column')}")
+    print(f"- Country code: {config.get('country_code', '+92')}")
+    print(f"- Variables: {len(config.get('selected_vars', []))} selected")
+    print(f"- Campaign: {campaign_id(config)}{' (resume)' if config.get('resume') else ''}")
+    if config.get('profile_dir'):
+        print(f"- Chrome profile: {config.get('profile_dir')}")
+    print(f"\n⚠️ Note: You have {config.get('login_timeout', 60)} seconds to scan QR code")
+
+
+def check_config(config):
+    """Problems that would stop a campaign - reads the file header only, starts no browser"""
+    problems = []
+    for key in ('file_path', 'phone_column', 'message_template'):
+        if not config.get(key):
+            problems.append(f"'{key}' is missing")
+    if config.get('backend', 'selenium') not in ('selenium', 'fake'):
+        problems.append(f"Unknown backend: {config.get('backend')}")
+    try:
+        normalize_country_code(config.get('country_code', '+92'))
+    except ValueError as e:
+        problems.append(str(e))
+    file_path = config.get('file_path')
+    if not file_path:
+        return problems, []
+    if not os.path.exists(file_path):
+        problems.append(f"Contact file not found: {file_path}")
+        return problems, []
+    try:
+        columns = read_columns(file_path)
+    except Exception as e:
+        problems.append(f"Cannot read {file_path}: {str(e)[:200]}")
+        return problems, []
+    phone_column = config.get('phone_column')
+    if phone_column and phone_column not in columns:
+        problems.append(f"Phone column '{phone_column}' not in {os.path.basename(file_path)}")
+    missing = [name for name in config.get('selected_vars', []) if name not in columns]
+    if missing:
+        problems.append(f"Selected variable(s) not in the file: {', '.join(map(str, missing))}")
+    warnings = []
+    if config.get('message_template'):
+        warnings = MessageTemplate(config['message_template'], columns,
+                                   config.get('selected_vars', []), phone_column).warnings()
+    return problems, warnings
+
+
+def check_configs(config_files):
+    """--check: validate every config without starting Chrome - True when all are usable"""
+    ok = True
+    for config_file in config_files:
+        print(f"\n{config_file}")
+        try:
+            problems, warnings = check_config(load_config(config_file))
+        except (OSError, ValueError) as e:
+            problems, warnings = [f"Cannot load config: {e}"], []
+        for problem in problems:
+            print(f"  ✗ {problem}")
+        for warning in warnings:
+            print(f"  ⚠️ {warning}")
+        if not problems:
+            print("  ✓ Config is valid")
+        ok = ok and not problems
+    return ok
+
+
+def profile_startup():
+    """--profile-startup: cold import time of the automation and the GUI"""
+    print("Cold import profile (python -X importtime, fresh interpreter per module)")
+    for module in ('whatsapp_automation', 'whatsapp_gui'):
+        print_import_profile(import_profile(module))
+
+
+def print_banner():
+    print("=" * 70)
+    print("WHATSAPP AUTOMATION")
+    print("=" * 70)
+    print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 70)
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python whatsapp_automation.py <config_file>")
-        input("\nPress Enter to exit...")
-        return
+    parser = argparse.ArgumentParser(description="Send WhatsApp messages from an Excel file")
+    parser.add_argument("config_files", nargs="*", metavar="config_file",
+                        help="JSON config written by the GUI; several run as a batch on one browser session")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip contacts already confirmed in this campaign's journal")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="never wait for Enter (for supervisors/schedulers); exit code 1 on failure")
+    parser.add_argument("--progress", metavar="HOST:PORT",
+                        help="stream progress events to the GUI and accept pause/resume/cancel")
+    parser.add_argument("--watch", metavar="DIR",
+                        help="daemon mode: keep one browser session and run every config dropped into DIR")
+    parser.add_argument("--poll", type=float, default=5, metavar="SECONDS",
+                        help="how often --watch looks for new configs (default 5)")
+    parser.add_argument("--check", action="store_true",
+                        help="validate the config file(s) and exit without starting Chrome")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="show which imports the automation and the GUI spend their start-up time on")
+    args = parser.parse_args()
+    interactive = not args.non_interactive
+    
+    if args.profile_startup:
+        profile_startup()
+        return 0
     
-    config_file = sys.argv[1]
+    if not args.config_files and not args.watch:
+        print("Usage: python whatsapp_automation.py <config_file> [more configs...] [--resume] "
+              "[--non-interactive] [--progress HOST:PORT] [--watch DIR] [--check] [--profile-startup]")
+        if interactive:
+            input("\nPress Enter to exit...")
+        return 2
+    if args.check:
+        return 0 if check_configs(args.config_files) else 1
+    
+    print_banner()
+    
+    success = False
+    progress = None
     
     try:
-        print(f"Loading config...")
-        with open(config_file, 'r') as f:
-            config = json.load(f)
+        if args.progress:
+            try:
+                progress = ProgressClient(args.progress)
+                print(f"✓ Reporting progress to the GUI ({args.progress})")
+            except OSError as e:
+                print(f"⚠️ Could not reach the GUI at {args.progress}: {e}")
         
-        # Show config details
-        print(f"\nConfiguration:")
-        print(f"- File: {config.get('file_path')}")
-        print(f"- Phone column: {config.get('phone_column')}")
-        print(f"- Country code: {config.get('country_code', '+92')}")
-        print(f"- Variables: {len(config.get('selected_vars', []))} selected")
-        print(f"\n⚠️ Note: You have 60 seconds to scan QR code")
+        if args.watch or len(args.config_files) > 1:
+            # Batch / daemon: one browser session for every campaign
+            if progress:
+                runner = BatchRunner(sleep=progress.control.sleep, control=progress.control,
+                                     listeners=[progress.send])
+            else:
+                runner = BatchRunner()
+            try:
+                if args.config_files:
+                    runner.run_files(args.config_files, args.resume)
+                if args.watch:
+                    runner.watch(args.watch, args.poll, args.resume)
+            except KeyboardInterrupt:
+                print("\n⚠️ Stopped")
+            finally:
+                runner.close()
+            runner.print_summary()
+            success = bool(runner.results) and all(result['ok'] for result in runner.results)
+            message = f"{sum(r['ok'] for r in runner.results)}/{len(runner.results)} campaigns succeeded"
+        else:
+            print(f"Loading config...")
+            config = load_config(args.config_files[0], args.resume)
+            print_config(config)
+            
+            if progress:
+                automation = WhatsAppAutomation(config, sleep=progress.control.sleep, control=progress.control)
+                automation.metrics.listeners.append(progress.send)
+            else:
+                automation = WhatsAppAutomation(config)
+            success, message = automation.run()  # This calls the run() method
         
-        automation = WhatsAppAutomation(config)
-        success, message = automation.run()  # This calls the run() method
+        if progress:
+            progress.send({'type': 'done', 'ok': success, 'message': message})
         
         print("\n" + "=" * 70)
         print("RESULT")
@@ -347,10 +849,17 @@ def main():
     except Exception as e:
         print(f"\n✗ Error: {str(e)}")
         traceback.print_exc()
+        if progress:
+            progress.send({'type': 'done', 'ok': False, 'message': str(e)})
+    finally:
+        if progress:
+            progress.close()
     
     print("\n" + "=" * 70)
-    input("Press Enter to close...")
+    if interactive:
+        input("Press Enter to close...")
+    return 0 if success else 1
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,789 @@
+"""
+WHATSAPP BACKENDS - real Chrome/WhatsApp Web and an offline fake
+"""
+
+import os
+import random
+import time
+import zlib
+
+# selenium is imported inside SeleniumBackend - the fake backend, config
+# checks and the GUI never need it
+
+from whatsapp_selectors import COMPOSE_BOX_STRATEGIES, SelectorResolver
+
+# Upper bounds (seconds) for each readiness / completion condition in
+# send_message. Override any of them with the "timeouts" key in the config.
+DEFAULT_TIMEOUTS = {
+    'chat_load': 30,      # chat footer rendered after opening the chat
+    'compose_box': 15,    # message input found inside the chat
+    'focus': 5,           # message input has keyboard focus after click
+    'clear': 5,           # message input is empty after Ctrl+A / Delete
+    'dismiss': 5,         # invalid-number popup closed after clicking its button
+    'input': 5,           # message input holds the full rendered message
+    'send_confirm': 20,   # outgoing bubble shows the pending/sent tick
+}
+
+# Lean mode (config "lean"): true for these defaults, or a dict overriding some
+DEFAULT_LEAN = {
+    'window_size': "1280,800",   # fixed size instead of a maximized window
+    'headless': "auto",          # "auto" = headless once the profile holds a login
+    'block_urls': [              # dropped by Chrome before any request is made
+        "*pps.whatsapp.net*",    # profile pictures
+        "*mmg.whatsapp.net*",    # media downloads / thumbnails
+        "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*",
+        "*.mp4*", "*.ogg*", "*.webm*",
+        "*.woff*", "*.ttf*",
+    ],
+}
+
+# Background work Chrome does that a send host never needs
+LEAN_CHROME_FLAGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-notifications",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+]
+
+# Outgoing bubble tick icons: clock (pending), single and double check (sent)
+SENT_TICK_SELECTOR = (
+    "span[data-icon='msg-time'], "
+    "span[data-icon='msg-check'], "
+    "span[data-icon='msg-dblcheck']"
+)
+
+
+# Pastes text into the compose box in one operation (newlines and emoji
+# included) - the editor handles it exactly like a Ctrl+V from the user.
+PASTE_SCRIPT = """
+const box = arguments[0].closest('[contenteditable="true"]') || arguments[0];
+const data = new DataTransfer();
+data.setData('text/plain', arguments[1]);
+box.focus();
+box.dispatchEvent(new ClipboardEvent('paste', {
+    clipboardData: data, bubbles: true, cancelable: true}));
+"""
+
+# Modal popups and their buttons. Detecting and dismissing the invalid-number
+# popup must use the same selectors, or a popup we detect may stay open.
+DIALOG_SELECTOR = "div[data-animate-modal-popup='true'], div[role='dialog']"
+DIALOG_BUTTON_SELECTOR = "button, div[role='button']"
+
+# 'open' once a chat panel other than arguments[0] has its footer rendered,
+# 'invalid' when WhatsApp shows "Phone number shared via url is invalid"
+# instead. That popup is recognised by its structure, not its (translated)
+# text: a modal with a single button, other than the one already open before
+# navigating (arguments[1]), while no new chat has opened. The "Starting
+# chat" popup shown while the chat loads has no button.
+CHAT_STATE_SCRIPT = """
+const main = document.querySelector('#main');
+if (main && main !== arguments[0] && main.querySelector('footer')) return 'open';
+const dialog = document.querySelector(arguments[2]);
+if (dialog && dialog !== arguments[1]
+        && dialog.querySelectorAll(arguments[3]).length === 1) return 'invalid';
+return null;
+"""
+
+# Clicks a click-to-chat link inside WhatsApp's app root so its router can
+# handle it. arguments[1] is stored on window first: if it is gone afterwards
+# the page was reloaded and the switch was not in-app.
+IN_APP_LINK_SCRIPT = """
+window.__inAppSwitch = arguments[1];
+const root = document.querySelector('#app') || document.body;
+const a = document.createElement('a');
+a.href = arguments[0];
+a.style.display = 'none';
+root.appendChild(a);
+a.click();
+a.remove();
+"""
+
+IN_APP_MARKER_SCRIPT = "return window.__inAppSwitch === arguments[0];"
+
+# Clicks the only button of the open popup; returns the popup so the caller
+# can wait for it to go away.
+DISMISS_DIALOG_SCRIPT = """
+const dialog = document.querySelector(arguments[0]);
+if (!dialog) return null;
+const buttons = dialog.querySelectorAll(arguments[1]);
+if (buttons.length) buttons[buttons.length - 1].click();
+return dialog;
+"""
+
+# Compact page state for failure diagnostics - one round trip, no screenshot
+DIAGNOSE_SCRIPT = """
+const main = document.querySelector('#main');
+const footer = main && main.querySelector('footer');
+const dialog = document.querySelector("div[data-animate-modal-popup='true'], div[role='dialog']");
+const active = document.activeElement;
+return {
+    url: location.href,
+    title: document.title,
+    ready_state: document.readyState,
+    viewport: [window.innerWidth, window.innerHeight],
+    chat_open: !!main,
+    footer_html: footer ? footer.outerHTML.slice(0, 2000) : null,
+    dialog_text: dialog ? dialog.innerText.slice(0, 500) : null,
+    compose_boxes: document.querySelectorAll("footer [contenteditable='true']").length,
+    active_element: active ? active.tagName + (active.dataset.tab ? '[data-tab=' + active.dataset.tab + ']' : '') : null,
+    last_outgoing_icons: Array.from(document.querySelectorAll("#main span[data-icon^='msg-']"))
+        .slice(-3).map(icon => icon.dataset.icon),
+    dom_nodes: document.getElementsByTagName('*').length,
+};
+"""
+
+COMPOSE_TEXT_SCRIPT = """
+const box = arguments[0].closest('[contenteditable="true"]') || arguments[0];
+return box.innerText;
+"""
+
+
+def normalize_compose_text(text):
+    """Comparable form of compose box text (the editor renders newlines as paragraphs)"""
+    text = (text or "").replace("\u00a0", " ").replace("\r", "")
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line).strip()
+
+
+class SendNotConfirmed(Exception):
+    """ENTER was pressed but the message was not confirmed - it may have been delivered"""
+
+
+class WhatsAppBackend:
+    """Everything WhatsAppAutomation needs from a browser, one method per step.
+
+    open_chat returns False when the number is not on WhatsApp; the other
+    steps raise an exception on failure.
+    """
+
+    name = "backend"
+
+    def start(self):
+        """Start the browser - True when ready"""
+        raise NotImplementedError
+
+    def wait_for_login(self):
+        """Wait until chats can be opened - True to continue"""
+        raise NotImplementedError
+
+    def open_chat(self, phone):
+        """Open the chat for phone - False if the number is not on WhatsApp"""
+        raise NotImplementedError
+
+    def dismiss_dialog(self):
+        """Close the invalid-number dialog - False if it is still open"""
+        return True
+
+    def find_compose_box(self):
+        """Return (strategy_name, compose_box)"""
+        raise NotImplementedError
+
+    def compose(self, box, message):
+        """Focus, clear and fill the compose box, verifying its content"""
+        raise NotImplementedError
+
+    def send(self, box):
+        """Press send and wait until the message is confirmed"""
+        raise NotImplementedError
+
+    def diagnose(self, screenshot_width=None):
+        """Compact state after a failed attempt; 'screenshot_b64' (JPEG) only if asked"""
+        return {}
+
+    def report(self):
+        """Extra summary lines for the end of the run"""
+        return []
+
+    def is_alive(self):
+        """Whether a started session can still be used (batch mode checks between campaigns)"""
+        return True
+
+    def health(self):
+        """Browser health sample, e.g. {'js_heap_mb': ..., 'dom_nodes': ...}"""
+        return {}
+
+    def recycle(self, level):
+        """Fresh 'tab' or restarted 'driver', logged in again - True when ready"""
+        return False
+
+    def stop(self):
+        """Close the browser"""
+
+
+class SeleniumBackend(WhatsAppBackend):
+    """Chrome + WhatsApp Web through Selenium"""
+
+    name = "selenium"
+
+    def __init__(self, config, timeouts=None):
+        self.config = config
+        self.driver = None
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        # "in_app" opens chats inside the loaded page, "reload" uses driver.get
+        self.in_app_navigation = config.get('navigation', 'in_app') == 'in_app'
+        # "paste" inserts the whole message at once, "type" sends it line by line
+        self.input_mode = config.get('input_mode', 'paste')
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.selector_cache_file = config.get('selector_cache') or os.path.join(script_dir, "selector_cache.json")
+        self.selectors = None
+        # Reusing a Chrome profile keeps the WhatsApp session between runs
+        profile_dir = config.get('profile_dir')
+        self.profile_dir = os.path.abspath(os.path.expanduser(profile_dir)) if profile_dir else None
+        lean = config.get('lean')
+        self.lean = None
+        if lean:
+            self.lean = dict(DEFAULT_LEAN)
+            if isinstance(lean, dict):
+                self.lean.update(lean)
+        self.headless = False
+        self.performance_enabled = False
+
+    def has_saved_login(self):
+        """Whether the Chrome profile already holds a WhatsApp Web session"""
+        if not self.profile_dir:
+            return False
+        return os.path.isdir(os.path.join(self.profile_dir, "Default", "IndexedDB",
+                                          "https_web.whatsapp.com_0.indexeddb.leveldb"))
+
+    def apply_lean(self):
+        """Block images/media/fonts through DevTools and hide headless from WhatsApp"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {'urls': self.lean['block_urls']})
+            print(f"✓ Lean mode: blocking {len(self.lean['block_urls'])} URL patterns")
+            if self.headless:
+                # WhatsApp Web refuses browsers that call themselves HeadlessChrome
+                agent = self.driver.execute_cdp_cmd("Browser.getVersion", {})['userAgent']
+                self.driver.execute_cdp_cmd("Network.setUserAgentOverride",
+                                            {'userAgent': agent.replace("HeadlessChrome", "Chrome")})
+        except Exception as e:
+            print(f"⚠️ Lean mode request blocking unavailable: {str(e)[:100]}")
+
+    def start(self):
+        """Setup Chrome - Simple & Clean"""
+        print("\n[2/4] SETTING UP CHROME")
+        print("-" * 40)
+
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
+            print(f"Using Chrome profile: {self.profile_dir}")
+        if self.lean:
+            for flag in LEAN_CHROME_FLAGS:
+                chrome_options.add_argument(flag)
+            chrome_options.add_argument(f"--window-size={self.lean['window_size']}")
+            headless = self.lean['headless']
+            # Headless only works once logged in - there is nobody to scan a QR code
+            self.headless = headless is True or (headless == "auto" and self.has_saved_login())
+            if self.headless:
+                chrome_options.add_argument("--headless=new")
+                print("Running headless (saved WhatsApp login found)")
+
+        try:
+            print("Opening Chrome...")
+            self.driver = webdriver.Chrome(options=chrome_options)
+            if self.lean:
+                self.apply_lean()
+            else:
+                self.driver.maximize_window()
+            self.selectors = SelectorResolver(self.driver, self.selector_cache_file)
+            print("✓ Chrome ready")
+            return True
+        except Exception as e:
+            print(f"✗ Chrome error: {str(e)[:200]}")
+            return False
+
+    def login_state(self):
+        """'ready' once the chat list is interactive, 'qr' while the QR code is shown"""
+        return self.driver.execute_script(
+            "const pane = document.querySelector('#pane-side');"
+            "const search = document.querySelector(\"#side div[contenteditable='true']\");"
+            "if (pane && search && pane.getBoundingClientRect().height > 0) return 'ready';"
+            "if (document.querySelector('div[data-ref] canvas, canvas[aria-label]')) return 'qr';"
+            "return 'loading';")
+
+    def wait_for_login(self):
+        """Wait until the chat list is usable - returns as soon as it is"""
+        print(f"\n[3/4] WHATSAPP WEB")
+        print("-" * 40)
+
+        wait_time = self.config.get('login_timeout', 60)
+
+        try:
+            print("Loading WhatsApp Web...")
+            self.driver.get("https://web.whatsapp.com/")
+
+            start_time = time.time()
+            last_report = 0
+            qr_shown = False
+
+            while time.time() - start_time < wait_time:
+                try:
+                    state = self.login_state()
+                except Exception:
+                    state = 'loading'
+
+                if state == 'ready':
+                    elapsed = time.time() - start_time
+                    print(f"✓ WhatsApp loaded successfully! ({elapsed:.1f}s)")
+                    return True
+
+                if state == 'qr' and self.headless:
+                    print("✗ WhatsApp asks for a QR scan but Chrome is headless")
+                    print("  Run once with \"lean\": {\"headless\": false} to log in again")
+                    return False
+
+                if state == 'qr' and not qr_shown:
+                    qr_shown = True
+                    print("\n" + "=" * 70)
+                    print("SCAN QR CODE")
+                    print("=" * 70)
+                    print("1. Look at Chrome window")
+                    print("2. Scan QR code with your phone")
+                    print(f"3. You have {wait_time} seconds to scan")
+                    print("=" * 70)
+                    if self.profile_dir:
+                        print("(Login is saved in the Chrome profile - next run skips this)")
+
+                # Show progress every 15 seconds
+                elapsed = int(time.time() - start_time)
+                if elapsed - last_report >= 15:
+                    last_report = elapsed
+                    print(f"  {elapsed}/{wait_time} seconds...")
+
+                time.sleep(0.25)
+
+            print(f"⚠️ {wait_time} seconds elapsed - chat list not detected")
+            print("⚠️ Continuing anyway - please ensure WhatsApp is loaded")
+            return True  # Continue anyway
+
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            print("⚠️ Continuing anyway...")
+            return True  # Continue anyway
+
+    def wait_until(self, condition, timeout_name, error=""):
+        """Poll a condition until it is truthy or its configured timeout expires"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        wait = WebDriverWait(self.driver, self.timeouts[timeout_name], poll_frequency=0.1)
+        return wait.until(condition, error or f"Timed out waiting for {timeout_name}")
+
+    def has_focus(self, element):
+        """True when element (or its editable parent/child) is the active element"""
+        return self.driver.execute_script(
+            "const el = arguments[0], active = document.activeElement;"
+            "return active === el || el.contains(active) || active.contains(el);",
+            element)
+
+    def last_outgoing_message(self):
+        """Return the newest outgoing message bubble in the open chat, if any"""
+        return self.driver.execute_script(
+            "const out = document.querySelectorAll('div.message-out');"
+            "return out.length ? out[out.length - 1] : null;")
+
+    def confirmed_outgoing_message(self, previous):
+        """Return a new outgoing bubble that carries a pending/sent tick"""
+        return self.driver.execute_script(
+            "const out = document.querySelectorAll('div.message-out');"
+            "const last = out.length ? out[out.length - 1] : null;"
+            "if (!last || last === arguments[0]) return null;"
+            "return last.querySelector(arguments[1]) ? last : null;",
+            previous, SENT_TICK_SELECTOR)
+
+    def chat_state(self, previous, previous_dialog):
+        return self.driver.execute_script(CHAT_STATE_SCRIPT, previous, previous_dialog,
+                                          DIALOG_SELECTOR, DIALOG_BUTTON_SELECTOR)
+
+    def wait_for_chat(self, previous, error, previous_dialog=None):
+        """Wait until a new chat is open ('open') or the number is rejected ('invalid')"""
+        return self.wait_until(lambda d: self.chat_state(previous, previous_dialog),
+                               'chat_load', error)
+
+    def open_chat(self, phone):
+        """Open the chat for phone - False if WhatsApp says the number is invalid"""
+        on_whatsapp = (self.driver.current_url or "").startswith("https://web.whatsapp.com")
+        if self.in_app_navigation and on_whatsapp:
+            try:
+                return self.open_chat_in_app(phone)
+            except Exception as e:
+                # Don't pay the timeout again on every contact
+                self.in_app_navigation = False
+                print(f"  ⚠️ In-app chat switch failed ({str(e)[:60]}), using page reload from now on")
+
+        whatsapp_url = f"https://web.whatsapp.com/send?phone={phone}"
+        self.driver.get(whatsapp_url)
+
+        # Chat is usable once its footer (compose area) is rendered
+        return self.wait_for_chat(None, "Chat did not load") == 'open'
+
+    def open_chat_in_app(self, phone):
+        """Click a click-to-chat link inside WhatsApp Web so it switches chat without reloading.
+
+        Raises when the page was reloaded instead (the window marker is gone),
+        so open_chat stops trying in-app switches and reloads from then on.
+        """
+        previous = self.driver.execute_script("return document.querySelector('#main');")
+        # A popup left open before the click is not this number's verdict
+        previous_dialog = self.driver.execute_script(
+            "return document.querySelector(arguments[0]);", DIALOG_SELECTOR)
+        marker = f"{phone}:{time.time()}"
+        self.driver.execute_script(IN_APP_LINK_SCRIPT,
+                                   f"https://api.whatsapp.com/send?phone={phone.lstrip('+')}", marker)
+
+        def chat_state(driver):
+            if not driver.execute_script(IN_APP_MARKER_SCRIPT, marker):
+                return 'reloaded'
+            return self.chat_state(previous, previous_dialog)
+
+        # A different #main panel with its footer means the new chat is open
+        state = self.wait_until(chat_state, 'chat_load', "Chat did not open in-app")
+        if state == 'reloaded':
+            raise RuntimeError("the link reloaded the page instead of switching chat")
+        return state == 'open'
+
+    def dismiss_dialog(self):
+        dialog = self.driver.execute_script(DISMISS_DIALOG_SCRIPT, DIALOG_SELECTOR,
+                                            DIALOG_BUTTON_SELECTOR)
+        if dialog is None:
+            return True
+        from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+        try:
+            # Gone once it is detached from the page or hidden
+            self.wait_until(lambda d: not dialog.is_displayed(), 'dismiss')
+        except StaleElementReferenceException:
+            pass
+        except TimeoutException:
+            return False
+        return True
+
+    def find_compose_box(self):
+        # All strategies race in one poll; last run's winner is tried first
+        return self.selectors.resolve('compose_box', COMPOSE_BOX_STRATEGIES,
+                                      self.timeouts['compose_box'])
+
+    def compose_matches(self, message_box, message):
+        """True when the compose box holds exactly the expected message"""
+        current = self.driver.execute_script(COMPOSE_TEXT_SCRIPT, message_box)
+        return normalize_compose_text(current) == normalize_compose_text(message)
+
+    def type_message(self, message_box, message):
+        """Type message line by line (SHIFT+ENTER between lines)"""
+        from selenium.webdriver.common.keys import Keys
+        lines = message.split("\n")
+        for i, line in enumerate(lines):
+            message_box.send_keys(line)
+            if i < len(lines) - 1:
+                message_box.send_keys(Keys.SHIFT + Keys.ENTER)
+
+    def clear_message_box(self, message_box):
+        """Clear any existing text (Ctrl+A, Delete)"""
+        from selenium.webdriver.common.keys import Keys
+        message_box.send_keys(Keys.CONTROL + "a")
+        message_box.send_keys(Keys.DELETE)
+        self.wait_until(lambda d: not message_box.text.strip(),
+                        'clear', "Message box could not be cleared")
+
+    def insert_message(self, message_box, message):
+        """Put the full message in the compose box and verify it before sending"""
+        if self.input_mode == 'paste':
+            self.driver.execute_script(PASTE_SCRIPT, message_box, message)
+            try:
+                self.wait_until(lambda d: self.compose_matches(message_box, message),
+                                'input', "Pasted message does not match")
+                return
+            except Exception:
+                print("  ⚠️ Paste did not match, typing instead")
+                self.clear_message_box(message_box)
+
+        self.type_message(message_box, message)
+        self.wait_until(lambda d: self.compose_matches(message_box, message),
+                        'input', "Typed message does not match (dropped characters?)")
+
+    def compose(self, box, message):
+        # Click and focus on the message box
+        print("Focusing on message box...")
+        box.click()
+        self.wait_until(lambda d: self.has_focus(box),
+                        'focus', "Message box did not take focus")
+
+        self.clear_message_box(box)
+
+        print("Typing message...")
+        self.insert_message(box, message)
+
+    def send(self, box):
+        # Send the message and wait for its bubble to show a tick
+        from selenium.webdriver.common.keys import Keys
+        previous = self.last_outgoing_message()
+        box.send_keys(Keys.ENTER)
+        try:
+            self.wait_until(lambda d: self.confirmed_outgoing_message(previous),
+                            'send_confirm', "Sent message was not confirmed")
+        except Exception as e:
+            # The message may be on its way - retrying could deliver it twice
+            raise SendNotConfirmed((getattr(e, 'msg', None) or str(e)).strip().split("\n")[0]) from e
+
+    def diagnose(self, screenshot_width=None):
+        info = {'selectors': self.selectors.last if self.selectors else None}
+        try:
+            info['dom'] = self.driver.execute_script(DIAGNOSE_SCRIPT)
+        except Exception as e:
+            # Page unreachable - a screenshot would not work either
+            info['dom_error'] = str(e).split("\n")[0][:200]
+            return info
+        if screenshot_width:
+            width, height = info['dom']['viewport']
+            try:
+                shot = self.driver.execute_cdp_cmd("Page.captureScreenshot", {
+                    'format': 'jpeg', 'quality': 50,
+                    'clip': {'x': 0, 'y': 0, 'width': width, 'height': height,
+                             'scale': min(1.0, screenshot_width / max(width, 1))}})
+                info['screenshot_b64'] = shot['data']
+            except Exception:
+                pass
+        return info
+
+    def report(self):
+        return [f"Selectors - {line}" for line in self.selectors.report()] if self.selectors else []
+
+    def is_alive(self):
+        if not self.driver:
+            return False
+        try:
+            # A crashed renderer keeps its window handle but cannot run scripts
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def health(self):
+        sample = {}
+        try:
+            if not self.performance_enabled:
+                self.driver.execute_cdp_cmd("Performance.enable", {})
+                self.performance_enabled = True
+            metrics = {m['name']: m['value'] for m in
+                       self.driver.execute_cdp_cmd("Performance.getMetrics", {})['metrics']}
+            sample['js_heap_mb'] = round(metrics.get('JSHeapUsedSize', 0) / 1048576, 1)
+            sample['js_heap_total_mb'] = round(metrics.get('JSHeapTotalSize', 0) / 1048576, 1)
+            sample['dom_nodes'] = int(metrics.get('Nodes', 0))
+            sample['event_listeners'] = int(metrics.get('JSEventListeners', 0))
+        except Exception:
+            pass
+        rss = chrome_rss_mb(self.driver)
+        if rss is not None:
+            sample['rss_mb'] = rss
+        return sample
+
+    def recycle(self, level):
+        self.performance_enabled = False
+        if level == 'tab':
+            try:
+                # Open the new tab before closing the old one - closing the
+                # last tab would end the browser session
+                old_tab = self.driver.current_window_handle
+                self.driver.switch_to.new_window('tab')
+                new_tab = self.driver.current_window_handle
+                self.driver.switch_to.window(old_tab)
+                self.driver.close()
+                self.driver.switch_to.window(new_tab)
+                if self.lean:
+                    self.apply_lean()
+            except Exception as e:
+                print(f"  ✗ Could not open a new tab: {str(e)[:100]}")
+                return False
+        else:
+            if not self.profile_dir:
+                print("  ⚠️ No Chrome profile - the QR code has to be scanned again")
+            self.stop()
+            if not self.start():
+                return False
+        return self.wait_for_login()
+
+    def stop(self):
+        if self.selectors:
+            self.selectors.save()
+        if self.driver:
+            try:
+                self.driver.quit()
+            except:
+                pass
+            self.driver = None
+
+
+def chrome_rss_mb(driver):
+    """Resident memory of every Chrome process (None without psutil)"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        # chromedriver starts Chrome, so every browser process is its descendant
+        service = psutil.Process(driver.service.process.pid)
+        return round(sum(p.memory_info().rss for p in service.children(recursive=True)) / 1048576, 1)
+    except Exception:
+        return None
+
+
+class FakeBackendError(Exception):
+    """Failure injected by FakeBackend"""
+
+
+# Mean simulated seconds per step of the fake backend
+DEFAULT_FAKE_LATENCY = {
+    'start': 2.0,
+    'login': 3.0,
+    'navigation': 1.5,
+    'selector': 0.2,
+    'typing': 0.3,
+    'confirm': 1.0,
+}
+
+
+class FakeComposeBox:
+    """Stands in for the compose box element"""
+
+    def __init__(self, phone):
+        self.phone = phone
+        self.text = ""
+
+
+class FakeBackend(WhatsAppBackend):
+    """In-memory WhatsApp Web for offline benchmarks and regression runs.
+
+    latency       - {step: mean seconds}, see DEFAULT_FAKE_LATENCY
+    jitter        - +/- fraction applied to every latency
+    failure_rates - {step: probability} of raising FakeBackendError
+                    (steps: navigation, selector, typing, confirm); a confirm
+                    failure raises SendNotConfirmed like the real backend
+    invalid_rate  - share of numbers that are "not on WhatsApp"; decided by
+                    a hash of the number so retries get the same answer
+    heap_growth_mb - simulated memory leak per send; every 500 MB leaked
+                    doubles the latency until the tab is recycled
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=None, jitter=0.2, failure_rates=None, invalid_rate=0.0,
+                 invalid_numbers=(), seed=None, heap_growth_mb=0.0, sleep=time.sleep):
+        self.latency = dict(DEFAULT_FAKE_LATENCY)
+        self.latency.update(latency or {})
+        self.jitter = jitter
+        self.failure_rates = dict(failure_rates or {})
+        self.invalid_rate = invalid_rate
+        self.invalid_numbers = set(invalid_numbers)
+        self.random = random.Random(seed)
+        self.sleep = sleep
+        self.current_phone = None
+        self.sent = []          # (phone, message) confirmed by the fake
+        self.steps = 0
+        self.running = False
+        self.heap_growth_mb = heap_growth_mb
+        self.leaked_mb = 0.0
+
+    def pause(self, step):
+        seconds = self.latency.get(step, 0) * (1 + self.leaked_mb / 500.0)
+        if seconds > 0:
+            self.sleep(seconds * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+        self.steps += 1
+
+    def maybe_fail(self, step, error=FakeBackendError):
+        if self.random.random() < self.failure_rates.get(step, 0):
+            raise error(f"Injected {step} failure")
+
+    def is_invalid(self, phone):
+        if phone in self.invalid_numbers:
+            return True
+        return (zlib.crc32(phone.encode('utf-8')) % 10000) < self.invalid_rate * 10000
+
+    def start(self):
+        print("\n[2/4] FAKE WHATSAPP BACKEND")
+        print("-" * 40)
+        self.pause('start')
+        self.running = True
+        return True
+
+    def wait_for_login(self):
+        self.pause('login')
+        return True
+
+    def open_chat(self, phone):
+        self.pause('navigation')
+        self.maybe_fail('navigation')
+        self.current_phone = phone
+        return not self.is_invalid(phone)
+
+    def find_compose_box(self):
+        self.pause('selector')
+        self.maybe_fail('selector')
+        return 'fake', FakeComposeBox(self.current_phone)
+
+    def compose(self, box, message):
+        self.pause('typing')
+        self.maybe_fail('typing')
+        box.text = message
+
+    def send(self, box):
+        self.pause('confirm')
+        # Like the real send, a confirm failure happens after ENTER was pressed
+        self.maybe_fail('confirm', SendNotConfirmed)
+        self.sent.append((box.phone, box.text))
+        self.leaked_mb += self.heap_growth_mb
+
+    def report(self):
+        return [f"Fake backend - {len(self.sent)} messages confirmed, {self.steps} steps simulated"]
+
+    def is_alive(self):
+        return self.running
+
+    def health(self):
+        return {'js_heap_mb': round(50 + self.leaked_mb, 1)}
+
+    def diagnose(self, screenshot_width=None):
+        return {'phone': self.current_phone, 'steps': self.steps, 'leaked_mb': self.leaked_mb}
+
+    def recycle(self, level):
+        self.leaked_mb = 0.0
+        if level == 'driver':
+            self.start()
+        return self.wait_for_login()
+
+    def stop(self):
+        self.running = False
+
+
+class VirtualClock:
+    """time()/sleep() pair where sleeping only advances a counter"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+
+def create_backend(config, sleep=time.sleep):
+    """Backend named by config["backend"] ("selenium" by default)"""
+    kind = config.get('backend', 'selenium')
+    if kind == 'fake':
+        return FakeBackend(sleep=sleep, **(config.get('fake_backend') or {}))
+    if kind == 'selenium':
+        return SeleniumBackend(config, config.get('timeouts'))
+    raise ValueError(f"Unknown backend: {kind}")
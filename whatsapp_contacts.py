@@ -0,0 +1,406 @@
+"""
+CONTACTS - streaming contact sources, a parse-once contact cache,
+phone normalization, validation and de-duplication
+"""
+
+import csv
+import hashlib
+import json
+import os
+from collections import Counter
+
+# pandas is imported where it is used: the GUI and config checks start
+# without paying for it, the first contact file loads it
+
+# Contact statuses after normalization
+PHONE_OK = "ok"
+PHONE_EMPTY = "empty"
+PHONE_INVALID = "invalid"
+PHONE_DUPLICATE = "duplicate"
+PHONE_KNOWN_INVALID = "known_invalid"  # not on WhatsApp in an earlier campaign
+
+# E.164: '+', no leading zero, 8 to 15 digits in total
+E164_PATTERN = r"^\+[1-9]\d{7,14}$"
+
+# Digits after the country code for mobile numbers of countries with a
+# fixed length. Numbers with the configured country code must match it;
+# other countries only get the E.164 check.
+NATIONAL_NUMBER_LENGTHS = {
+    '+1': 10,     # US / Canada
+    '+20': 10,    # Egypt
+    '+44': 10,    # UK
+    '+91': 10,    # India
+    '+92': 10,    # Pakistan
+    '+234': 10,   # Nigeria
+    '+880': 10,   # Bangladesh
+    '+966': 9,    # Saudi Arabia
+    '+971': 9,    # UAE
+}
+
+# Rows per chunk when streaming a contact file
+CHUNK_ROWS = 5000
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+CSV_EXTENSIONS = ('.csv', '.txt')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + ('.xls',) + CSV_EXTENSIONS + PARQUET_EXTENSIONS
+
+# Parsed workbooks kept in the contact cache (oldest are evicted)
+CACHE_MAX_ENTRIES = 10
+
+
+def file_kind(path):
+    """'excel', 'xls', 'csv' or 'parquet' from the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        return 'excel'
+    if ext == '.xls':
+        return 'xls'
+    if ext in CSV_EXTENSIONS:
+        return 'csv'
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    raise ValueError(f"Unsupported file type '{ext}' (use {', '.join(SUPPORTED_EXTENSIONS)})")
+
+
+def parquet_file(path):
+    """Open a Parquet file (Parquet input and the contact cache)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files needs pyarrow: pip install pyarrow")
+    return pq.ParquetFile(path)
+
+
+def read_columns(path):
+    """Column names only - reads the header, not the data"""
+    kind = file_kind(path)
+    if kind == 'excel':
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return [name for name in header if name is not None]
+    if kind == 'parquet':
+        return list(parquet_file(path).schema_arrow.names)
+    import pandas as pd
+    if kind == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    return list(pd.read_excel(path, nrows=0).columns)
+
+
+def estimate_rows(path):
+    """Data row count when the file format records it cheaply, else None"""
+    kind = file_kind(path)
+    try:
+        if kind == 'excel':
+            from openpyxl import load_workbook
+            workbook = load_workbook(path, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+            finally:
+                workbook.close()
+            return max_row - 1 if max_row else None
+        if kind == 'parquet':
+            return parquet_file(path).metadata.num_rows
+    except Exception:
+        pass
+    return None
+
+
+def cell_text(value):
+    """Excel cell value as phone text (whole floats lose their '.0')"""
+    if value is None:
+        return None
+    try:
+        if value != value:  # NaN / NaT - a missing cell, not the text "nan"
+            return None
+    except TypeError:  # pd.NA cannot be compared
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_contact_chunks(path, columns=None, phone_column=None, chunk_rows=CHUNK_ROWS,
+                        as_text=False):
+    """Yield DataFrames holding only `columns`, phone column kept as text.
+
+    Excel (.xlsx) is streamed with openpyxl in read-only mode, CSV and
+    Parquet are read chunk by chunk, so memory stays flat for any file
+    size. Legacy .xls has no streaming reader and is read in one go.
+    columns=None keeps every column; as_text=True turns every value into
+    text (missing values stay None), which is how the contact cache stores them.
+    """
+    if columns is None:
+        columns = read_columns(path)
+    leading = [phone_column] if phone_column is not None else []
+    columns = list(dict.fromkeys(leading + list(columns)))
+    text_columns = columns if as_text else leading
+    kind = file_kind(path)
+    import pandas as pd
+
+    if kind == 'csv':
+        for chunk in pd.read_csv(path, usecols=columns, dtype={c: str for c in text_columns},
+                                 chunksize=chunk_rows):
+            yield chunk[columns]
+        return
+
+    if kind == 'parquet':
+        for batch in parquet_file(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            chunk = batch.to_pandas()
+            for column in text_columns:
+                chunk[column] = chunk[column].map(cell_text)
+            yield chunk[columns]
+        return
+
+    if kind == 'xls':
+        chunk = pd.read_excel(path, usecols=columns, dtype={c: str for c in text_columns})[columns]
+        if as_text:
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield chunk
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"Column(s) not found: {', '.join(map(str, missing))}")
+        positions = [header.index(c) for c in columns]
+        text_positions = range(len(text_columns))  # text columns lead `columns`
+
+        buffer = []
+        for row in rows:
+            if row is None or not any(v is not None for v in row):
+                continue
+            values = [row[i] if i < len(row) else None for i in positions]
+            for i in text_positions:
+                values[i] = cell_text(values[i])
+            buffer.append(values)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def phone_text(series):
+    """Phone column as text - floats like 3001234567.0 lose their '.0'"""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(series):
+        text = series.map(lambda v: "" if pd.isna(v) else format(v, ".0f"))
+    else:
+        text = series.astype(object).where(series.notna(), "").astype(str).str.strip()
+        # Numbers that went through a float somewhere ("3001234567.0")
+        text = text.str.replace(r"^(\+?\d+)\.0+$", r"\1", regex=True)
+    return text.astype(object)
+
+
+def normalize_country_code(code):
+    """'+92' from '+92', '92' or '0092' - ValueError if it is not 1-3 digits"""
+    digits = str(code).strip().replace(" ", "").replace("-", "")
+    digits = digits[1:] if digits.startswith("+") else digits[2:] if digits.startswith("00") else digits
+    if not (digits.isdigit() and 1 <= len(digits) <= 3 and digits[0] != "0"):
+        raise ValueError(f"Invalid country code: {code!r} (expected e.g. +92)")
+    return "+" + digits
+
+
+def normalize_phones(series, country_code="+92"):
+    """Normalize a whole phone column to E.164 at once.
+
+    Returns a DataFrame aligned with series.index with 'phone' (normalized
+    number) and 'status' (ok / empty / invalid / duplicate). Only the first
+    occurrence of a number is 'ok', later ones are 'duplicate'.
+    """
+    import pandas as pd
+    country_code = normalize_country_code(country_code)
+    national_length = NATIONAL_NUMBER_LENGTHS.get(country_code)
+    text = phone_text(series)
+    phone = text.str.replace(r"[^\d+]", "", regex=True)
+    # 00 is the international dialing prefix
+    phone = phone.str.replace(r"^00", "+", regex=True)
+
+    if national_length:
+        # "923001234567": the country code without its '+'
+        written_without_plus = (phone.str.startswith(country_code[1:])
+                                & (phone.str.len() == len(country_code) - 1 + national_length))
+        phone = phone.where(~written_without_plus, "+" + phone)
+
+    # Same rule as before: numbers without the country code get it
+    # prepended (dropping a trunk '0'); other '+' numbers are kept as-is
+    national = ~phone.str.startswith(country_code) & ~phone.str.startswith("+") & (phone != "")
+    phone = phone.where(~national, country_code + phone.str.replace(r"^0", "", regex=True))
+
+    status = pd.Series(PHONE_OK, index=series.index, dtype=object)
+    status[~phone.str.match(E164_PATTERN)] = PHONE_INVALID
+    if national_length:
+        wrong_length = phone.str.startswith(country_code) & (
+            phone.str.len() != len(country_code) + national_length)
+        status[wrong_length] = PHONE_INVALID
+    status[text == ""] = PHONE_EMPTY
+    valid = status == PHONE_OK
+    status[valid & phone.duplicated(keep="first")] = PHONE_DUPLICATE
+
+    return pd.DataFrame({'raw': text, 'phone': phone, 'status': status})
+
+
+class PreflightReport:
+    """CSV of every contact that will not be sent (and why), written chunk by chunk"""
+
+    def __init__(self, path):
+        self.path = path
+        self.counts = Counter()
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["row", "raw_phone", "normalized", "status"])
+
+    def add(self, contacts, first_row):
+        """Record a normalized chunk whose first contact is row number first_row"""
+        self.counts.update(contacts['status'])
+        is_problem = (contacts['status'] != PHONE_OK).to_numpy()
+        problems = contacts[is_problem]
+        for position, raw, phone, status in zip(
+                is_problem.nonzero()[0],
+                problems['raw'], problems['phone'], problems['status']):
+            self.writer.writerow([position + first_row, raw, phone, status])
+        self.file.flush()
+
+    def not_sendable(self):
+        return sum(count for status, count in self.counts.items() if status != PHONE_OK)
+
+    def close(self):
+        self.file.close()
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContactCache:
+    """Parse-once cache of contact files, shared by the GUI and the automation.
+
+    Each workbook is parsed a single time into a Parquet file (needs
+    pyarrow) with every value stored as text, which is then streamed like
+    any other Parquet input.
+    index.json maps a source path to its size, mtime and content hash, so
+    an unchanged file is found with one stat() call, and a touched but
+    identical file is found again by its hash.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, "index.json")
+
+    def load_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+    def cache_file(self, digest):
+        """Existing cache file for a content hash, or None"""
+        path = os.path.join(self.cache_dir, digest[:24] + '.parquet')
+        return path if os.path.exists(path) else None
+
+    def find(self, path):
+        """(cache file or None, content hash or None) for path.
+
+        The hash is only computed when size or mtime changed since the file
+        was indexed; it is returned so build() does not read the file again.
+        """
+        source = os.path.abspath(path)
+        stat = os.stat(source)
+        index = self.load_index()
+        entry = index.get(source)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return self.cache_file(entry['hash']), entry['hash']
+
+        # Size or mtime changed - the content may still be the same
+        digest = file_digest(source)
+        cached = self.cache_file(digest)
+        if cached:
+            index[source] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+            self.save_index(index)
+        return cached, digest
+
+    def lookup(self, path):
+        """Cache file for path if its content was parsed before, else None"""
+        return self.find(path)[0]
+
+    def build(self, path, progress=None, digest=None):
+        """Parse path into the cache and return the cache file.
+
+        progress(rows) is called after every chunk with the rows parsed so far;
+        an exception raised from it (e.g. to cancel) aborts the build.
+        digest is the content hash when the caller already has it.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The contact cache needs pyarrow: pip install pyarrow")
+
+        source = os.path.abspath(path)
+        stat = os.stat(source)
+        digest = digest or file_digest(source)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        columns = [str(c) for c in read_columns(source)]
+        chunks = iter_contact_chunks(source, as_text=True)
+
+        cache_file = os.path.join(self.cache_dir, digest[:24] + '.parquet')
+        schema = pa.schema([(c, pa.string()) for c in columns])
+        rows = 0
+        try:
+            with pq.ParquetWriter(cache_file + ".tmp", schema) as writer:
+                for chunk in chunks:
+                    chunk.columns = columns
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+                    if progress:
+                        progress(rows)
+        except BaseException:
+            # Cancelled or failed part way - never leave a half-written cache
+            chunks.close()
+            if os.path.exists(cache_file + ".tmp"):
+                os.remove(cache_file + ".tmp")
+            raise
+        os.replace(cache_file + ".tmp", cache_file)
+
+        index = self.load_index()
+        index[source] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+        self.save_index(index)
+        self.prune()
+        return cache_file
+
+    def get(self, path, progress=None):
+        """Cache file for path, parsing it first when it is not cached yet"""
+        cached, digest = self.find(path)
+        return cached or self.build(path, progress, digest)
+
+    def prune(self):
+        """Keep the CACHE_MAX_ENTRIES most recently written cache files"""
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith('.parquet')]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[CACHE_MAX_ENTRIES:]:
+            os.remove(path)
@@ -0,0 +1,94 @@
+"""
+DIAGNOSTICS - small failure artifacts in a size-capped ring buffer on disk
+"""
+
+import base64
+import json
+import os
+import re
+
+DEFAULT_DIAGNOSTICS = {
+    'max_mb': 20,              # total size of the ring buffer
+    'max_files': 300,          # artifact files kept (JSON and screenshots)
+    'screenshot': False,       # add a downscaled JPEG to each artifact
+    'screenshot_width': 480,   # ... at most this many pixels wide
+    'burst': 3,                # consecutive failures captured in full
+    'sample_every': 10,        # beyond the burst, capture one failure in N (no screenshot)
+}
+
+
+class DiagnosticsStore:
+    """Writes one JSON artifact per failed attempt, dropping the oldest
+    files once max_files or max_mb is exceeded."""
+
+    def __init__(self, directory, settings=None):
+        self.directory = directory
+        self.settings = dict(DEFAULT_DIAGNOSTICS)
+        self.settings.update(settings or {})
+        self.max_bytes = int(self.settings['max_mb'] * 1024 * 1024)
+        self.files = []            # (mtime, path, size), oldest first
+        self.total = 0
+        self.consecutive = 0       # failures in a row - the browser is probably unhealthy
+        self.skipped = 0
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and name.endswith(('.json', '.jpg')):
+                stat = os.stat(path)
+                self.files.append((stat.st_mtime, path, stat.st_size))
+        self.files.sort()
+        self.total = sum(size for _, _, size in self.files)
+
+    def record_success(self):
+        self.consecutive = 0
+
+    def plan(self):
+        """What to capture for the next failure: None, 'dom' or 'full'.
+
+        The first `burst` failures in a row are captured completely; after
+        that only one in `sample_every` and never a screenshot, so a sick
+        browser is not slowed down further by the diagnostics themselves.
+        """
+        self.consecutive += 1
+        if self.consecutive <= self.settings['burst']:
+            return 'full' if self.settings['screenshot'] else 'dom'
+        if (self.consecutive - self.settings['burst']) % self.settings['sample_every'] == 0:
+            return 'dom'
+        self.skipped += 1
+        return None
+
+    def save(self, name, record, screenshot_b64=None):
+        """Write record (and an optional base64 JPEG) - returns the JSON path"""
+        name = re.sub(r'[^\w.-]', '_', name)
+        if screenshot_b64:
+            image_path = os.path.join(self.directory, name + ".jpg")
+            with open(image_path, 'wb') as f:
+                f.write(base64.b64decode(screenshot_b64))
+            record['screenshot'] = os.path.basename(image_path)
+            self.track(image_path)
+        json_path = os.path.join(self.directory, name + ".json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, default=str)
+        self.track(json_path)
+        self.prune()
+        return json_path
+
+    def track(self, path):
+        stat = os.stat(path)
+        self.files.append((stat.st_mtime, path, stat.st_size))
+        self.total += stat.st_size
+
+    def prune(self):
+        while self.files and (self.total > self.max_bytes or len(self.files) > self.settings['max_files']):
+            _, path, size = self.files.pop(0)
+            self.total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def report(self):
+        lines = [f"Diagnostics: {len(self.files)} files, {self.total / 1048576:.1f} MB in {self.directory}"]
+        if self.skipped:
+            lines.append(f"  ({self.skipped} failures in long failure streaks were not captured)")
+        return lines
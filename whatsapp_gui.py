@@ -1,16 +1,44 @@
 import customtkinter as ctk
-import pandas as pd
+import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
 import json
+import queue
 import sys
 import subprocess
 import tempfile
+import threading
 import traceback
+from datetime import datetime
+
+from whatsapp_contacts import (PHONE_OK, ContactCache, estimate_rows, iter_contact_chunks,
+                               normalize_country_code, normalize_phones, read_columns)
+from whatsapp_journal import SendJournal, campaign_id
+from whatsapp_progress import (COMMAND_CANCEL, COMMAND_PAUSE, COMMAND_RESUME, TOKEN_ENV,
+                               ProgressServer)
+from whatsapp_template import MessageTemplate
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+POLL_MS = 100            # how often the GUI checks on the file loading thread
+PREVIEW_ROWS = 5         # contacts shown in the message preview
+PREVIEW_DELAY_MS = 400   # re-render the preview once typing pauses this long
+DASHBOARD_LOG_LINES = 200  # contacts kept in the dashboard's activity log
+WARM_UP_DELAY_MS = 500   # start importing pandas this long after the window appears
+
+
+class LoadCancelled(Exception):
+    """Raised inside the loading thread when the user cancels"""
+
+
+def warm_up_imports():
+    """Import pandas off the main thread so the first file loads without the wait"""
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        pass  # reported when a file is loaded
+
 
 class App(ctk.CTk):
 
@@ -24,9 +52,23 @@ class App(ctk.CTk):
         self.minsize(800, 600)
 
         # Variables
-        self.df = None
+        self.columns = None
+        self.column_names = []      # column names as shown in the picker
+        self.visible_columns = []   # column_names matching the filter, in list order
+        self.selected_vars = set()
+        self.estimated_rows = None
+        self.sample = None          # first PREVIEW_ROWS contacts, for the preview
+        self.load_events = None     # queue the loading thread reports to
+        self.load_cancel = None
+        self.preview_job = None
+        # Workbooks are parsed once here and the automation reads the parsed copy
+        self.contact_cache = ContactCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), "contact_cache"))
+        self.cache_file = None
         self.phone_var = ctk.StringVar()
         self.country_var = ctk.StringVar(value="+92")
+        self.filter_var = ctk.StringVar()
+        self.remember_login_var = ctk.BooleanVar(value=True)
+        self.lean_var = ctk.BooleanVar(value=False)
         self.file_path = ""  # Store full file path
 
         # outer scrollable window
@@ -34,6 +76,8 @@ class App(ctk.CTk):
         self.main_scroll.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.create_widgets()
+        # The window is up before pandas is imported (see whatsapp_contacts)
+        self.after(WARM_UP_DELAY_MS, lambda: threading.Thread(target=warm_up_imports, daemon=True).start())
 
     def create_widgets(self):
 
@@ -41,31 +85,64 @@ class App(ctk.CTk):
         top = ctk.CTkFrame(self.main_scroll)
         top.pack(fill="x", pady=10)
 
-        ctk.CTkLabel(top, text="Excel File:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        ctk.CTkLabel(top, text="Contacts File:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
         self.file_label = ctk.CTkLabel(top, text="(no file selected)", wraplength=500)
         self.file_label.grid(row=0, column=1, sticky="w", padx=5)
-        self.choose_file_btn = ctk.CTkButton(top, text="Choose Excel", command=self.upload_file)
+        self.choose_file_btn = ctk.CTkButton(top, text="Choose File", command=self.upload_file)
         self.choose_file_btn.grid(row=0, column=2, padx=5)
 
+        # ========== Loading progress (shown while a file is parsed) ==========
+        self.load_progress = ctk.CTkProgressBar(top, width=300)
+        self.load_progress.grid(row=5, column=1, sticky="w", padx=5, pady=5)
+        self.cancel_load_btn = ctk.CTkButton(top, text="Cancel", width=80, command=self.cancel_loading)
+        self.cancel_load_btn.grid(row=5, column=2, padx=5)
+        self.load_progress.grid_remove()
+        self.cancel_load_btn.grid_remove()
+
         # ========== Phone column ==========
         ctk.CTkLabel(top, text="Phone Column:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
-        self.phone_combo = ctk.CTkComboBox(top, values=[], width=300)
+        self.phone_combo = ctk.CTkComboBox(top, values=[], width=300,
+                                           command=lambda _: self.schedule_preview())
         self.phone_combo.grid(row=1, column=1, columnspan=2, sticky="w", padx=5)
 
         # ========== Country Code ==========
         ctk.CTkLabel(top, text="Country Code (e.g. +92):").grid(row=2, column=0, sticky="w", padx=5)
         ctk.CTkEntry(top, textvariable=self.country_var, width=120).grid(row=2, column=1, sticky="w", padx=5)
+        self.country_var.trace_add("write", lambda *_: self.schedule_preview())
 
-        # ========== Headers Checkbox Area ==========
+        # ========== Persistent Login ==========
+        ctk.CTkCheckBox(top, text="Remember WhatsApp login (skip QR scan next time)",
+                        variable=self.remember_login_var).grid(row=3, column=1, columnspan=2, sticky="w", padx=5, pady=5)
+        ctk.CTkCheckBox(top, text="Lean browser (no images or media, small window, headless once logged in)",
+                        variable=self.lean_var).grid(row=4, column=1, columnspan=2, sticky="w", padx=5, pady=5)
+
+        # ========== Column Picker ==========
+        # A plain Listbox only draws the visible rows, so sheets with hundreds
+        # of columns stay fast (one widget per column did not)
         hdr_frame = ctk.CTkFrame(self.main_scroll)
         hdr_frame.pack(fill="both", pady=10)
 
         ctk.CTkLabel(hdr_frame, text="Select Columns to Use as Variables:").pack(anchor="w", padx=5, pady=5)
 
-        self.headers_scroll = ctk.CTkScrollableFrame(hdr_frame, width=850, height=220)
-        self.headers_scroll.pack(padx=5, pady=5)
-
-        self.header_vars = {}
+        filter_row = ctk.CTkFrame(hdr_frame, fg_color="transparent")
+        filter_row.pack(fill="x", padx=5)
+        ctk.CTkEntry(filter_row, textvariable=self.filter_var, width=300,
+                     placeholder_text="Filter columns...").pack(side="left")
+        self.selection_label = ctk.CTkLabel(filter_row, text="0 selected")
+        self.selection_label.pack(side="left", padx=10)
+        self.filter_var.trace_add("write", lambda *_: self.refresh_column_list())
+
+        list_frame = ctk.CTkFrame(hdr_frame, fg_color="transparent")
+        list_frame.pack(fill="both", padx=5, pady=5)
+        self.column_list = tk.Listbox(list_frame, selectmode=tk.MULTIPLE, exportselection=False,
+                                      height=10, activestyle="none", borderwidth=0, highlightthickness=0,
+                                      bg="#2b2b2b", fg="#dce4ee", selectbackground="#1f6aa5",
+                                      font=("Segoe UI", 11))
+        column_scrollbar = ctk.CTkScrollbar(list_frame, command=self.column_list.yview)
+        self.column_list.configure(yscrollcommand=column_scrollbar.set)
+        self.column_list.pack(side="left", fill="both", expand=True)
+        column_scrollbar.pack(side="right", fill="y")
+        self.column_list.bind("<<ListboxSelect>>", self.on_column_select)
 
         # ========== Message Textbox ==========
         ctk.CTkLabel(self.main_scroll, text="Custom Message (use {ColumnName} variables):")\
@@ -74,6 +151,15 @@ class App(ctk.CTk):
         self.msg_box = ctk.CTkTextbox(self.main_scroll, width=850, height=260)
         self.msg_box.pack(padx=5, pady=5)
         self.msg_box.insert("0.0", "Hello {Name},\nThis is an Automated WhatsApp Message.\nThankYou")
+        self.msg_box.bind("<KeyRelease>", lambda _: self.schedule_preview())
+
+        # ========== Message Preview ==========
+        ctk.CTkLabel(self.main_scroll, text=f"Preview (first {PREVIEW_ROWS} contacts):")\
+            .pack(anchor="w", padx=5, pady=(10, 5))
+
+        self.preview_box = ctk.CTkTextbox(self.main_scroll, width=850, height=180)
+        self.preview_box.pack(padx=5, pady=5)
+        self.show_preview("(preview appears once a file is loaded)")
 
         # ========== Status Label ==========
         self.status_label = ctk.CTkLabel(self.main_scroll, text="Status: Ready", text_color="green")
@@ -89,45 +175,205 @@ class App(ctk.CTk):
         self.start_button.pack(pady=15)
 
     def upload_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx *.xls")])
+        file_path = filedialog.askopenfilename(filetypes=[
+            ("Contact Files", "*.xlsx *.xlsm *.xls *.csv *.parquet"),
+            ("Excel Files", "*.xlsx *.xlsm *.xls"),
+            ("CSV Files", "*.csv"),
+            ("Parquet Files", "*.parquet"),
+        ])
         if not file_path:
             return
 
+        self.cancel_loading()
         self.file_path = file_path
         filename = os.path.basename(file_path)
         self.file_label.configure(text=filename)
-        
+        self.columns = None
+        self.cache_file = None
+        self.sample = None
+
+        # Parsing runs in a worker thread; it reports back through a queue
+        # that the Tk main loop polls, so the window never freezes
+        self.load_events = queue.Queue()
+        self.load_cancel = threading.Event()
+        threading.Thread(target=self.load_file_worker,
+                         args=(file_path, self.load_events, self.load_cancel),
+                         daemon=True).start()
+        self.set_loading(True)
+        self.status_label.configure(text="Status: Reading file...", text_color="orange")
+        self.after(POLL_MS, self.poll_loading, self.load_events)
+
+    def load_file_worker(self, file_path, events, cancel):
+        """Header, contact cache and preview sample for file_path (worker thread - no Tk calls)"""
+        def progress(rows):
+            if cancel.is_set():
+                raise LoadCancelled()
+            events.put(('progress', rows))
+
         try:
-            self.df = pd.read_excel(file_path)
-            self.populate_headers()
-            self.status_label.configure(text="Status: File loaded successfully", text_color="green")
+            events.put(('columns', read_columns(file_path), estimate_rows(file_path)))
+            try:
+                # Instant for a workbook parsed before, otherwise parsed once now
+                cache_file = self.contact_cache.get(file_path, progress)
+            except LoadCancelled:
+                raise
+            except Exception as e:
+                print(f"Contact cache unavailable: {e}")
+                cache_file = None
+            if cancel.is_set():
+                raise LoadCancelled()
+
+            chunks = iter_contact_chunks(cache_file or file_path, chunk_rows=PREVIEW_ROWS, as_text=True)
+            sample = next(chunks, None)
+            chunks.close()
+            if sample is not None:
+                sample.columns = [str(c) for c in sample.columns]
+            events.put(('done', cache_file, sample))
+        except LoadCancelled:
+            events.put(('cancelled',))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load Excel file:\n{str(e)}")
+            events.put(('error', str(e)))
+
+    def poll_loading(self, events):
+        """Apply whatever the loading thread reported since the last poll"""
+        if events is not self.load_events:
+            return  # a newer file replaced this load
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == 'columns':
+                self.columns, self.estimated_rows = event[1], event[2]
+                self.populate_headers()
+                self.status_label.configure(text="Status: Parsing rows...", text_color="orange")
+            elif kind == 'progress':
+                rows = event[1]
+                if self.estimated_rows:
+                    self.load_progress.set(min(rows / self.estimated_rows, 1.0))
+                    self.status_label.configure(text=f"Status: Parsed {rows:,} of ~{self.estimated_rows:,} rows",
+                                                text_color="orange")
+                elif rows:
+                    self.status_label.configure(text=f"Status: Parsed {rows:,} rows", text_color="orange")
+            elif kind == 'done':
+                self.cache_file, self.sample = event[1], event[2]
+                self.finish_loading()
+                self.status_label.configure(text="Status: File loaded successfully", text_color="green")
+                self.schedule_preview()
+                return
+            elif kind == 'cancelled':
+                self.finish_loading()
+                self.status_label.configure(text="Status: Loading cancelled - the file is read when sending",
+                                            text_color="orange")
+                return
+            elif kind == 'error':
+                self.columns = None
+                self.finish_loading()
+                self.status_label.configure(text="Status: Failed to load file", text_color="red")
+                messagebox.showerror("Error", f"Failed to load file:\n{event[1]}")
+                return
+        self.after(POLL_MS, self.poll_loading, events)
+
+    def set_loading(self, busy):
+        if busy:
+            self.load_progress.set(0)
+            self.load_progress.grid()
+            self.cancel_load_btn.grid()
+            self.start_button.configure(state="disabled")
+        else:
+            self.load_progress.grid_remove()
+            self.cancel_load_btn.grid_remove()
+            self.start_button.configure(state="normal")
+
+    def finish_loading(self):
+        self.load_events = None
+        self.load_cancel = None
+        self.set_loading(False)
+
+    def cancel_loading(self):
+        """Ask a running load to stop (it stops after the current chunk)"""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+            self.status_label.configure(text="Status: Cancelling...", text_color="orange")
 
     def populate_headers(self):
-        if self.df is None:
+        if self.columns is None:
             return
 
-        cols = list(self.df.columns)
-
-        self.phone_combo.configure(values=cols)
-        if len(cols) > 0:
-            self.phone_combo.set(cols[0])
-
-        for widget in self.headers_scroll.winfo_children():
-            widget.destroy()
+        self.column_names = [str(c) for c in self.columns]
+
+        self.phone_combo.configure(values=self.column_names)
+        if len(self.column_names) > 0:
+            self.phone_combo.set(self.column_names[0])
+
+        self.selected_vars = set()
+        self.filter_var.set("")
+        self.refresh_column_list()
+
+    def refresh_column_list(self):
+        """Show the columns matching the filter, keeping their selection"""
+        needle = self.filter_var.get().strip().lower()
+        self.visible_columns = [c for c in self.column_names if needle in c.lower()]
+        self.column_list.delete(0, "end")
+        if self.visible_columns:
+            self.column_list.insert("end", *self.visible_columns)
+        for i, col in enumerate(self.visible_columns):
+            if col in self.selected_vars:
+                self.column_list.selection_set(i)
+        self.selection_label.configure(text=f"{len(self.selected_vars)} selected")
+
+    def on_column_select(self, _event=None):
+        chosen = set(self.column_list.curselection())
+        for i, col in enumerate(self.visible_columns):
+            if i in chosen:
+                self.selected_vars.add(col)
+            else:
+                self.selected_vars.discard(col)
+        self.selection_label.configure(text=f"{len(self.selected_vars)} selected")
+        self.schedule_preview()
+
+    def schedule_preview(self):
+        """Render the preview once input pauses, not on every keystroke"""
+        if self.preview_job is not None:
+            self.after_cancel(self.preview_job)
+        self.preview_job = self.after(PREVIEW_DELAY_MS, self.render_preview)
+
+    def render_preview(self):
+        """Messages for the sample rows, rendered exactly like the automation does"""
+        self.preview_job = None
+        if self.sample is None:
+            self.show_preview("(preview appears once a file is loaded)")
+            return
 
-        self.header_vars = {}
+        try:
+            phone_column = self.phone_combo.get()
+            sample = self.sample.copy()
+            template = MessageTemplate(self.msg_box.get("0.0", "end").strip(), sample.columns,
+                                       self.selected_vars, phone_column)
+            lines = [f"⚠️ {warning}" for warning in template.warnings()]
+            if phone_column in sample.columns:
+                contacts = normalize_phones(sample[phone_column], self.country_var.get().strip())
+                sample[phone_column] = contacts['raw']
+                phones = [phone if status == PHONE_OK else f"{phone or '(empty)'} ({status})"
+                          for phone, status in zip(contacts['phone'], contacts['status'])]
+            else:
+                phones = ["?"] * len(sample)
+            for phone, message in zip(phones, template.render_frame(sample)):
+                lines.append(f"→ {phone}\n{message}\n")
+            self.show_preview("\n".join(lines))
+        except Exception as e:
+            self.show_preview(f"(preview failed: {e})")
 
-        for col in cols:
-            var = ctk.BooleanVar()
-            chk = ctk.CTkCheckBox(self.headers_scroll, text=col, variable=var)
-            chk.pack(anchor="w", padx=5)
-            self.header_vars[col] = var
+    def show_preview(self, text):
+        self.preview_box.configure(state="normal")
+        self.preview_box.delete("0.0", "end")
+        self.preview_box.insert("0.0", text)
+        self.preview_box.configure(state="disabled")
 
     def validate_inputs(self):
-        if self.df is None:
-            messagebox.showerror("Error", "Please select an Excel file first!")
+        if self.columns is None:
+            messagebox.showerror("Error", "Please select a contacts file first!")
             return False
         
         if not self.file_path:
@@ -142,9 +388,10 @@ class App(ctk.CTk):
             messagebox.showerror("Error", "Message template cannot be empty!")
             return False
         
-        country_code = self.country_var.get().strip()
-        if not country_code.startswith('+'):
-            messagebox.showerror("Error", "Country code must start with '+' (e.g., +92)")
+        try:
+            normalize_country_code(self.country_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return False
         
         return True
@@ -154,25 +401,35 @@ class App(ctk.CTk):
             return
         
         if not messagebox.askyesno("Confirm", 
-                                   "The GUI will close and automation will run in background.\n"
+                                   "Automation will run in its own console with a live progress window.\n"
                                    "A new Chrome window will open.\n"
-                                   "You have 60 seconds to scan QR code.\n\n"
+                                   "Scan the QR code if asked (60 seconds).\n\n"
                                    "Continue?"):
             return
         
         config = {
             'file_path': self.file_path,
             'phone_column': self.phone_combo.get(),
-            'country_code': self.country_var.get(),
-            'selected_vars': [h for h, v in self.header_vars.items() if v.get()],
+            'country_code': normalize_country_code(self.country_var.get()),
+            'selected_vars': [c for c in self.column_names if c in self.selected_vars],
             'message_template': self.msg_box.get("0.0", "end").strip()
         }
+        if self.cache_file:
+            config['contact_cache'] = self.cache_file
+        if self.remember_login_var.get():
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            config['profile_dir'] = os.path.join(script_dir, "chrome_profile")
+        if self.lean_var.get():
+            config['lean'] = True
+        
+        resume = self.ask_resume(config)
+        if resume is None:
+            return
         
         try:
-            temp_dir = tempfile.gettempdir()
-            config_file = os.path.join(temp_dir, "whatsapp_automation_config.json")
-            
-            with open(config_file, 'w') as f:
+            # One config file per run, so two campaigns never overwrite each other's
+            fd, config_file = tempfile.mkstemp(prefix="whatsapp_automation_", suffix=".json")
+            with os.fdopen(fd, 'w') as f:
                 json.dump(config, f, indent=4)
             
             script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -187,17 +444,179 @@ class App(ctk.CTk):
             
             python_exe = sys.executable
             
+            # Progress comes back over a local socket; the token proves the
+            # connecting process is the one started here
+            server = ProgressServer()
+            command = [python_exe, automation_script, config_file, "--progress", server.address]
+            if resume:
+                command.append("--resume")
+            env = dict(os.environ, **{TOKEN_ENV: server.token})
             if os.name == 'nt':
-                subprocess.Popen([python_exe, automation_script, config_file], 
-                               creationflags=subprocess.CREATE_NEW_CONSOLE)
+                process = subprocess.Popen(command, env=env,
+                                           creationflags=subprocess.CREATE_NEW_CONSOLE)
             else:
-                subprocess.Popen([python_exe, automation_script, config_file])
+                process = subprocess.Popen(command, env=env)
             
-            self.after(500, self.destroy)
+            dashboard = CampaignDashboard(self, process, server)
+            dashboard.log(f"Config: {config_file}{' (--resume)' if resume else ''}")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start automation:\n{str(e)}")
 
+    def ask_resume(self, config):
+        """True to skip contacts this campaign already reached, False to send to all, None to abort"""
+        # Same journal and campaign id the automation will use
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        journal_file = os.path.join(script_dir, "send_journal.db")
+        if not os.path.exists(journal_file):
+            return False
+        campaign = campaign_id(config)
+        try:
+            journal = SendJournal(journal_file)
+            try:
+                sent = journal.confirmed(campaign)
+                uncertain = journal.in_flight(campaign) - sent
+            finally:
+                journal.close()
+        except Exception:
+            return False  # unreadable journal - the automation reports it
+        if not sent and not uncertain:
+            return False
+        return messagebox.askyesnocancel(
+            "Resume campaign",
+            f"This file and message were already used for a campaign:\n"
+            f"{len(sent)} contact(s) sent, {len(uncertain)} possibly sent.\n\n"
+            f"Yes - continue it and skip those contacts\n"
+            f"No - send to every contact again\n"
+            f"Cancel - don't start")
+
+class CampaignDashboard(ctk.CTkToplevel):
+    """Live view of a running campaign with pause / resume / cancel"""
+
+    def __init__(self, master, process, server):
+        super().__init__(master)
+        self.title("Campaign Progress")
+        self.geometry("640x520")
+        self.process = process
+        self.server = server
+        self.finished = False
+        self.paused = False
+
+        self.status_label = ctk.CTkLabel(self, text="Starting automation...", text_color="orange")
+        self.status_label.pack(anchor="w", padx=10, pady=(10, 5))
+
+        self.progress_bar = ctk.CTkProgressBar(self, width=600)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(padx=10, pady=5)
+
+        self.counts_label = ctk.CTkLabel(self, text="Sent 0  |  Failed 0  |  Skipped 0")
+        self.counts_label.pack(anchor="w", padx=10)
+        self.rate_label = ctk.CTkLabel(self, text="Throughput: -  |  ETA: -")
+        self.rate_label.pack(anchor="w", padx=10)
+
+        self.log_box = ctk.CTkTextbox(self, width=600, height=300)
+        self.log_box.pack(padx=10, pady=10, fill="both", expand=True)
+        self.log_box.configure(state="disabled")
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(pady=(0, 10))
+        self.pause_btn = ctk.CTkButton(buttons, text="Pause", width=120, command=self.toggle_pause)
+        self.pause_btn.pack(side="left", padx=5)
+        self.cancel_btn = ctk.CTkButton(buttons, text="Cancel Campaign", width=140, fg_color="#c0392b",
+                                        hover_color="#962d22", command=self.cancel_campaign)
+        self.cancel_btn.pack(side="left", padx=5)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.after(POLL_MS, self.poll_events)
+
+    def poll_events(self):
+        """Drain the events the progress server queued since the last poll"""
+        while True:
+            try:
+                event = self.server.events.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_event(event)
+
+        if not self.finished and self.process.poll() is not None and self.server.events.empty():
+            self.finish(f"Automation exited (code {self.process.returncode})", ok=self.process.returncode == 0)
+        if not self.finished:
+            self.after(POLL_MS, self.poll_events)
+
+    def handle_event(self, event):
+        kind = event.get('type')
+        if kind == 'hello':
+            self.set_status("Connected - starting Chrome...")
+        elif kind == 'stage' and event.get('stage') == 'driver_setup':
+            self.set_status("Waiting for WhatsApp login (scan the QR code if asked)...")
+        elif kind == 'stage' and event.get('stage') == 'login':
+            self.set_status("Sending messages...")
+        elif kind == 'progress':
+            self.show_progress(event)
+        elif kind == 'state':
+            self.paused = event.get('state') == 'paused'
+            self.pause_btn.configure(text="Resume" if self.paused else "Pause")
+            self.set_status("Paused" if self.paused else "Sending messages...")
+        elif kind == 'done':
+            self.finish(event.get('message', "Finished"), ok=event.get('ok'))
+        elif kind == 'disconnected' and not self.finished:
+            self.set_status("Lost connection to the automation - see its console", color="red")
+
+    def show_progress(self, event):
+        total, done = event.get('total'), event.get('done', 0)
+        if total:
+            self.progress_bar.set(min(done / total, 1.0))
+        self.counts_label.configure(
+            text=f"Sent {event.get('sent', 0)}  |  Failed {event.get('failed', 0)}  |  "
+                 f"Skipped {event.get('skipped', 0)}  |  Done {done}/{total or '?'}  |  "
+                 f"Retry queue {event.get('retry_queue', 0)}")
+        eta = event.get('eta')
+        eta_text = datetime.fromtimestamp(eta).strftime('%H:%M') if eta else "-"
+        self.rate_label.configure(text=f"Throughput: {event.get('sends_per_hour', 0):.0f} sends/hour  |  ETA: {eta_text}")
+        self.log(f"{event.get('row')}: {event.get('phone')} - {event.get('status')}")
+
+    def log(self, line):
+        self.log_box.configure(state="normal")
+        self.log_box.insert("end", line + "\n")
+        # Keep the widget small on long campaigns
+        lines = int(self.log_box.index("end-1c").split(".")[0])
+        if lines > DASHBOARD_LOG_LINES:
+            self.log_box.delete("1.0", f"{lines - DASHBOARD_LOG_LINES}.0")
+        self.log_box.see("end")
+        self.log_box.configure(state="disabled")
+
+    def set_status(self, text, color="orange"):
+        self.status_label.configure(text=text, text_color=color)
+
+    def toggle_pause(self):
+        command = COMMAND_RESUME if self.paused else COMMAND_PAUSE
+        if self.server.send_command(command):
+            self.set_status("Resuming..." if self.paused else "Pausing after the current contact...")
+
+    def cancel_campaign(self):
+        if not messagebox.askyesno("Cancel", "Stop the campaign after the current contact?\n"
+                                             "Start it again with the same file and message to "
+                                             "continue where it stopped.", parent=self):
+            return
+        if self.server.send_command(COMMAND_CANCEL):
+            self.set_status("Cancelling after the current contact...")
+
+    def finish(self, message, ok=True):
+        self.finished = True
+        self.set_status(message, color="green" if ok else "red")
+        self.pause_btn.configure(state="disabled")
+        self.cancel_btn.configure(state="disabled")
+        self.server.close()
+
+    def close(self):
+        if not self.finished and not messagebox.askyesno(
+                "Close", "The campaign keeps running in its console.\nClose this window?", parent=self):
+            return
+        if not self.finished:
+            self.server.close()
+        self.destroy()
+
+
 def main():
     app = App()
     app.mainloop()
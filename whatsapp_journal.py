@@ -0,0 +1,107 @@
+"""
+SEND JOURNAL - append-only record of every send attempt (crash safe)
+"""
+
+import hashlib
+import sqlite3
+import time
+from datetime import datetime
+
+# Attempt statuses
+STATUS_SENDING = "sending"   # written before touching the browser
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+STATUS_INVALID = "invalid"   # number is not on WhatsApp - never retried
+STATUS_UNCONFIRMED = "unconfirmed"  # ENTER was pressed but no tick seen - never resent
+
+
+def campaign_id(config):
+    """Stable id for a campaign - explicit "campaign" key or a hash of its inputs"""
+    if config.get('campaign'):
+        return str(config['campaign'])
+    key = "|".join([
+        str(config.get('file_path', '')),
+        str(config.get('phone_column', '')),
+        str(config.get('message_template', '')),
+    ])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+class SendJournal:
+    """SQLite journal keyed by campaign + normalized phone"""
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit: every record() is its own durable transaction
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                row INTEGER,
+                attempt INTEGER,
+                status TEXT NOT NULL,
+                detail TEXT,
+                created_at TEXT NOT NULL,
+                artifact TEXT
+            )
+        """)
+        # Journals from before failure diagnostics have no artifact column
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(attempts)")}
+        if 'artifact' not in columns:
+            self.conn.execute("ALTER TABLE attempts ADD COLUMN artifact TEXT")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_attempts_campaign_phone ON attempts (campaign, phone)")
+        # Negative cache shared by all campaigns
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS invalid_numbers (
+                phone TEXT PRIMARY KEY,
+                detected_at REAL NOT NULL
+            )
+        """)
+
+    def record(self, campaign, phone, status, row=None, attempt=None, detail="", artifact=None):
+        """Append one attempt status and return its journal id"""
+        cursor = self.conn.execute(
+            "INSERT INTO attempts (campaign, phone, row, attempt, status, detail, created_at, artifact) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (campaign, phone, row, attempt, status, detail or "",
+             datetime.now().isoformat(timespec='seconds'), artifact))
+        return cursor.lastrowid
+
+    def confirmed(self, campaign):
+        """Phones already confirmed as sent in this campaign"""
+        rows = self.conn.execute(
+            "SELECT DISTINCT phone FROM attempts WHERE campaign = ? AND status = ?",
+            (campaign, STATUS_SENT))
+        return {phone for (phone,) in rows}
+
+    def in_flight(self, campaign):
+        """Phones whose last entry is 'sending' or 'unconfirmed' - they may have been delivered"""
+        rows = self.conn.execute("""
+            SELECT phone, status FROM attempts
+            WHERE id IN (SELECT MAX(id) FROM attempts WHERE campaign = ? GROUP BY phone)
+        """, (campaign,))
+        return {phone for phone, status in rows if status in (STATUS_SENDING, STATUS_UNCONFIRMED)}
+
+    def mark_invalid(self, phone):
+        """Remember that phone is not on WhatsApp"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO invalid_numbers (phone, detected_at) VALUES (?, ?)",
+            (phone, time.time()))
+
+    def known_invalid(self, max_age_days):
+        """Phones found invalid within the last max_age_days"""
+        cutoff = time.time() - max_age_days * 86400
+        rows = self.conn.execute(
+            "SELECT phone FROM invalid_numbers WHERE detected_at >= ?", (cutoff,))
+        return {phone for (phone,) in rows}
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
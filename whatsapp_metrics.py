@@ -0,0 +1,173 @@
+"""
+METRICS - per-stage timings, JSONL events and campaign summaries
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Stages timed during a campaign, in pipeline order
+STAGES = [
+    'driver_setup',
+    'login',
+    'workbook_load',
+    'prepare',
+    'navigation',
+    'selector',
+    'typing',
+    'confirm',
+    'recycle',
+]
+
+# Stages of one send attempt (browser work for a single contact)
+SEND_STAGES = ['navigation', 'selector', 'typing', 'confirm']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Metrics:
+    """Collects stage timings and send outcomes for one campaign"""
+
+    def __init__(self, campaign, events_file=None, clock=time.time):
+        self.campaign = campaign
+        self.clock = clock
+        self.started_at = clock()
+        self.durations = {}            # stage -> [seconds]
+        self.stage_errors = Counter()  # stage -> failed count
+        self.outcomes = Counter()      # sent / failed / invalid
+        self.failure_reasons = Counter()
+        self.listeners = []            # callables receiving every event dict
+        self.last_durations = {}       # stage -> (finished_at, seconds) of its latest run
+        self.last_failure = None       # (stage, finished_at) of the latest failed stage
+        self.lock = threading.Lock()   # events come from the sender and the contact producer
+        self.events = None
+        if events_file:
+            os.makedirs(os.path.dirname(os.path.abspath(events_file)), exist_ok=True)
+            self.events = open(events_file, 'a', encoding='utf-8', buffering=1)
+
+    def event(self, kind, **fields):
+        """Write one JSONL event (and pass it on to listeners)"""
+        record = {'ts': round(self.clock(), 3), 'campaign': self.campaign, 'type': kind}
+        record.update(fields)
+        with self.lock:
+            if self.events:
+                self.events.write(json.dumps(record, default=str) + "\n")
+            for listener in self.listeners:
+                listener(record)
+        return record
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a block as one stage; failures are recorded and re-raised"""
+        start = self.clock()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            finished = self.clock()
+            duration = finished - start
+            self.durations.setdefault(name, []).append(duration)
+            self.last_durations[name] = (finished, duration)
+            if not ok:
+                self.stage_errors[name] += 1
+                self.last_failure = (name, finished)
+            self.event('stage', stage=name, duration=round(duration, 4), ok=ok, **fields)
+
+    def outcome(self, status, phone=None, reason=""):
+        """Record the final or intermediate result of one send attempt"""
+        self.outcomes[status] += 1
+        if reason:
+            self.failure_reasons[reason] += 1
+        self.event('send', status=status, phone=phone, reason=reason)
+
+    def sends_per_hour(self, sent_status="sent"):
+        """Confirmed sends per hour since the campaign started"""
+        elapsed = max(self.clock() - self.started_at, 1e-9)
+        return self.outcomes.get(sent_status, 0) / elapsed * 3600
+
+    def summary(self, sent_status="sent"):
+        """Per-stage p50/p95/p99, throughput and failure reasons"""
+        elapsed = max(self.clock() - self.started_at, 1e-9)
+        stages = {}
+        for name in STAGES + sorted(set(self.durations) - set(STAGES)):
+            values = self.durations.get(name)
+            if not values:
+                continue
+            stages[name] = {
+                'count': len(values),
+                'errors': self.stage_errors.get(name, 0),
+                'total': round(sum(values), 3),
+                'p50': round(percentile(values, 50), 3),
+                'p95': round(percentile(values, 95), 3),
+                'p99': round(percentile(values, 99), 3),
+            }
+        return {
+            'campaign': self.campaign,
+            'elapsed_seconds': round(elapsed, 1),
+            'outcomes': dict(self.outcomes),
+            'sends_per_hour': round(self.sends_per_hour(sent_status), 1),
+            'failure_reasons': dict(self.failure_reasons.most_common()),
+            'stages': stages,
+        }
+
+    def write_summary(self, path):
+        """Write summary() as JSON and emit it as a 'summary' event"""
+        summary = self.summary()
+        write_atomic(path, json.dumps(summary, indent=4))
+        self.event('summary', **summary)
+        return summary
+
+    def write_prometheus(self, path):
+        """Export the summary in Prometheus textfile-collector format"""
+        summary = self.summary()
+        label = f'campaign="{self.campaign}"'
+        lines = [
+            "# HELP whatsapp_stage_seconds Stage duration quantiles.",
+            "# TYPE whatsapp_stage_seconds summary",
+        ]
+        for name, stats in summary['stages'].items():
+            for quantile in ('p50', 'p95', 'p99'):
+                q = int(quantile[1:]) / 100.0
+                lines.append(f'whatsapp_stage_seconds{{{label},stage="{name}",quantile="{q}"}} {stats[quantile]}')
+            lines.append(f'whatsapp_stage_seconds_sum{{{label},stage="{name}"}} {stats["total"]}')
+            lines.append(f'whatsapp_stage_seconds_count{{{label},stage="{name}"}} {stats["count"]}')
+        lines += [
+            "# HELP whatsapp_sends_total Send attempts by outcome.",
+            "# TYPE whatsapp_sends_total counter",
+        ]
+        for status, count in summary['outcomes'].items():
+            lines.append(f'whatsapp_sends_total{{{label},status="{status}"}} {count}')
+        lines += [
+            "# HELP whatsapp_sends_per_hour Confirmed sends per hour over the campaign.",
+            "# TYPE whatsapp_sends_per_hour gauge",
+            f"whatsapp_sends_per_hour{{{label}}} {summary['sends_per_hour']}",
+        ]
+        write_atomic(path, "\n".join(lines) + "\n")
+
+    def close(self):
+        if self.events:
+            self.events.close()
+            self.events = None
+
+
+def write_atomic(path, text):
+    """Write a file via rename so readers never see half of it"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,100 @@
+"""
+PIPELINE - prepares contacts in a producer thread while the browser sends
+"""
+
+import queue
+import threading
+import time
+
+# Contacts prepared ahead of the browser by default
+DEFAULT_PREFETCH = 10000
+
+_DONE = object()
+
+
+class PrefetchQueue:
+    """Runs a generator in a producer thread that fills a bounded queue.
+
+    Iterating yields the generator's items in order. The producer stays at
+    most `maxsize` items ahead; an exception in the producer is re-raised in
+    the consumer once it reaches that point. wait_seconds / starved count how
+    often the consumer had to wait for data (the producer lagging behind).
+    """
+
+    def __init__(self, items, maxsize=DEFAULT_PREFETCH, name="contact-producer"):
+        self.items = items
+        self.queue = queue.Queue(maxsize=max(int(maxsize), 1))
+        self.stop_event = threading.Event()
+        self.error = None
+        self.produced = 0
+        self.consumed = 0
+        self.starved = 0          # gets that found the queue empty
+        self.wait_seconds = 0.0   # consumer time spent waiting on the producer
+        self.done = False
+        self.thread = threading.Thread(target=self.produce, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def produce(self):
+        try:
+            for item in self.items:
+                if not self.put(item):
+                    return
+                self.produced += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            close = getattr(self.items, 'close', None)
+            if close:
+                close()
+            self.put(_DONE)
+
+    def put(self, item):
+        """Blocking put that gives up once the consumer has stopped"""
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                self.starved += 1
+                started = time.perf_counter()
+                item = self.queue.get()
+                self.wait_seconds += time.perf_counter() - started
+            if item is _DONE:
+                if self.error is not None:
+                    raise self.error
+                return
+            self.consumed += 1
+            yield item
+
+    def depth(self):
+        """Prepared items waiting for the consumer"""
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            'queue_depth': self.depth(),
+            'queue_size': self.queue.maxsize,
+            'prepared': self.produced,
+            'consumed': self.consumed,
+            'producer_done': self.done,
+            'consumer_waits': self.starved,
+            'consumer_wait_seconds': round(self.wait_seconds, 3),
+        }
+
+    def close(self, timeout=5):
+        """Stop the producer (consumer finished early) and wait for the thread"""
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
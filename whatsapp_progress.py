@@ -0,0 +1,169 @@
+"""
+PROGRESS CHANNEL - live events from the automation to the GUI, and
+pause / resume / cancel commands back
+
+JSON lines over a local TCP socket. The GUI listens on 127.0.0.1 and
+starts the automation with --progress host:port; the automation connects,
+proves it was started by this GUI with a token passed in the environment,
+then streams every metrics event.
+"""
+
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+
+TOKEN_ENV = "WHATSAPP_PROGRESS_TOKEN"
+
+# Commands the GUI can send
+COMMAND_PAUSE = "pause"
+COMMAND_RESUME = "resume"
+COMMAND_CANCEL = "cancel"
+
+
+class CampaignControl:
+    """Pause / cancel flags checked by the automation between contacts"""
+
+    def __init__(self):
+        self.running = threading.Event()   # cleared while paused
+        self.running.set()
+        self.cancel_event = threading.Event()
+
+    def apply(self, command):
+        if command == COMMAND_PAUSE:
+            self.running.clear()
+        elif command == COMMAND_RESUME:
+            self.running.set()
+        elif command == COMMAND_CANCEL:
+            self.cancel_event.set()
+            self.running.set()
+
+    def paused(self):
+        return not self.running.is_set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def wait_while_paused(self):
+        self.running.wait()
+
+    def sleep(self, seconds):
+        """time.sleep that returns early when the campaign is cancelled"""
+        self.cancel_event.wait(max(seconds, 0))
+
+
+def parse_address(address):
+    """'host:port' -> (host, port)"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def send_line(sock, lock, record):
+    data = (json.dumps(record, default=str) + "\n").encode('utf-8')
+    with lock:
+        sock.sendall(data)
+
+
+class ProgressClient:
+    """Automation side: streams events to the GUI and applies its commands"""
+
+    def __init__(self, address, token=None, control=None, timeout=5):
+        self.control = control or CampaignControl()
+        self.lock = threading.Lock()
+        self.sock = socket.create_connection(parse_address(address), timeout=timeout)
+        self.sock.settimeout(None)
+        self.connected = True
+        token = token if token is not None else os.environ.get(TOKEN_ENV, "")
+        send_line(self.sock, self.lock, {'type': 'hello', 'token': token, 'pid': os.getpid()})
+        threading.Thread(target=self.read_commands, daemon=True).start()
+
+    def read_commands(self):
+        try:
+            for line in self.sock.makefile('r', encoding='utf-8'):
+                try:
+                    self.control.apply(json.loads(line).get('command'))
+                except ValueError:
+                    continue
+        except OSError:
+            pass
+        self.connected = False
+
+    def send(self, record):
+        """Metrics listener - a closed GUI never stops the campaign"""
+        if not self.connected:
+            return
+        try:
+            send_line(self.sock, self.lock, record)
+        except OSError:
+            self.connected = False
+
+    def close(self):
+        self.connected = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ProgressServer:
+    """GUI side: accepts one automation process and queues its events.
+
+    Events are put on self.events from a background thread; the Tk main loop
+    drains the queue with after(), so no widget is touched off the main thread.
+    """
+
+    def __init__(self, host="127.0.0.1"):
+        self.token = secrets.token_hex(16)
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.conn = None
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind((host, 0))
+        self.listener.listen(1)
+        self.address = "%s:%d" % self.listener.getsockname()[:2]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        try:
+            while True:
+                conn, _ = self.listener.accept()
+                reader = conn.makefile('r', encoding='utf-8')
+                try:
+                    hello = json.loads(reader.readline() or "{}")
+                except ValueError:
+                    hello = {}
+                if hello.get('token') != self.token:
+                    conn.close()  # not the process this GUI started
+                    continue
+                self.conn = conn
+                self.events.put(hello)
+                for line in reader:
+                    try:
+                        self.events.put(json.loads(line))
+                    except ValueError:
+                        continue
+                self.events.put({'type': 'disconnected'})
+                self.conn = None
+                return
+        except OSError:
+            self.events.put({'type': 'disconnected'})
+
+    def send_command(self, command):
+        """Send pause / resume / cancel; False when nothing is connected"""
+        if self.conn is None:
+            return False
+        try:
+            send_line(self.conn, self.lock, {'command': command})
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        for sock in (self.conn, self.listener):
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
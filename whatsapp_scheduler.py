@@ -0,0 +1,176 @@
+"""
+SEND SCHEDULER - pacing policy plus a deferred retry queue
+"""
+
+import heapq
+import random
+import time
+from collections import deque
+
+DEFAULT_PACING = {
+    'min_delay': 10,        # seconds between two sent messages (lower bound)
+    'max_delay': 25,        # ... and upper bound, picked at random in between
+    'max_per_hour': None,   # hard cap on sent messages in any 60 minute window
+}
+
+DEFAULT_RETRY = {
+    'max_attempts': 3,      # total attempts per contact, first one included
+    'base_delay': 30,       # first retry waits this long, doubling each time
+    'max_delay': 600,       # backoff never waits longer than this
+    'mode': 'interleave',   # 'interleave' with the main pass or run them 'after' it
+}
+
+
+class SendScheduler:
+    """Decides which contact goes next and when.
+
+    Iterating yields (item, attempt) pairs. After each attempt call
+    report(success, retryable) - failed contacts are pushed to a retry queue
+    with exponential backoff instead of blocking the main pass.
+    """
+
+    def __init__(self, items, total=None, pacing=None, retry=None,
+                 clock=time.time, sleep=time.sleep):
+        self.items = iter(items)
+        self.total = total
+        self.pacing = dict(DEFAULT_PACING)
+        self.pacing.update(pacing or {})
+        self.retry = dict(DEFAULT_RETRY)
+        self.retry.update(retry or {})
+        self.clock = clock
+        self.sleep = sleep
+
+        self.retry_queue = []          # heap of (due_time, sequence, item, attempt)
+        self.sequence = 0
+        self.main_done = False
+        self.next_send_at = 0          # pacing: no send before this time
+        self.sent_times = deque()      # rate window for max_per_hour
+        self.current = None            # (item, attempt, started_at)
+        self.completed = 0             # contacts with a final outcome
+        self.send_durations = deque(maxlen=50)
+
+    def __iter__(self):
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            yield job
+
+    def pacing_delay(self):
+        """Seconds to wait after a sent message"""
+        return random.uniform(self.pacing['min_delay'], self.pacing['max_delay'])
+
+    def backoff(self, attempt):
+        """Seconds before retry number `attempt` (1 = first retry)"""
+        delay = self.retry['base_delay'] * (2 ** (attempt - 1))
+        return min(delay, self.retry['max_delay'])
+
+    def take_main(self):
+        if self.main_done:
+            return None
+        try:
+            return next(self.items), 1
+        except StopIteration:
+            self.main_done = True
+            return None
+
+    def take_retry(self, only_due):
+        if not self.retry_queue:
+            return None
+        due_time = self.retry_queue[0][0]
+        if only_due and due_time > self.clock():
+            return None
+        self.wait_until(due_time, "retry backoff")
+        _, _, item, attempt = heapq.heappop(self.retry_queue)
+        return item, attempt
+
+    def wait_until(self, moment, reason):
+        delay = moment - self.clock()
+        if delay > 0:
+            if delay >= 1:
+                print(f"  ⏳ Waiting {delay:.0f}s ({reason})...")
+            self.sleep(delay)
+
+    def rate_slot(self):
+        """Earliest time another message may be sent under max_per_hour"""
+        limit = self.pacing.get('max_per_hour')
+        if not limit:
+            return 0
+        now = self.clock()
+        while self.sent_times and self.sent_times[0] <= now - 3600:
+            self.sent_times.popleft()
+        if len(self.sent_times) < limit:
+            return 0
+        return self.sent_times[0] + 3600
+
+    def next_job(self):
+        """Next (item, attempt) once pacing allows it, or None when everything is done"""
+        job = None
+        if self.retry['mode'] == 'interleave':
+            job = self.take_retry(only_due=True)
+        if job is None:
+            job = self.take_main()
+        if job is None:
+            job = self.take_retry(only_due=False)
+        if job is None:
+            return None
+
+        self.wait_until(self.next_send_at, "pacing")
+        self.wait_until(self.rate_slot(), "hourly limit")
+        self.current = (job[0], job[1], self.clock())
+        return job
+
+    def report(self, success, retryable=True):
+        """Record the outcome of the current job.
+
+        Returns the retry delay in seconds when the contact was re-queued,
+        otherwise None (sent, or out of attempts / not retryable).
+        """
+        item, attempt, started_at = self.current
+        self.current = None
+        now = self.clock()
+        self.send_durations.append(now - started_at)
+
+        if success:
+            self.completed += 1
+            self.sent_times.append(now)
+            self.next_send_at = now + self.pacing_delay()
+            return None
+
+        if retryable and attempt < self.retry['max_attempts']:
+            delay = self.backoff(attempt)
+            self.sequence += 1
+            heapq.heappush(self.retry_queue, (now + delay, self.sequence, item, attempt + 1))
+            return delay
+
+        self.completed += 1
+        return None
+
+    def exclude(self, count):
+        """Take contacts that turned out not to need sending out of the total"""
+        if self.total is not None:
+            self.total = max(self.total - count, 0)
+
+    def remaining(self):
+        """Contacts without a final outcome (None if the total is unknown)"""
+        if self.total is None:
+            return None
+        return max(self.total - self.completed, 0)
+
+    def projected_seconds(self):
+        """Projected time to finish the remaining contacts"""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        send_time = (sum(self.send_durations) / len(self.send_durations)) if self.send_durations else 0
+        cycle = send_time + (self.pacing['min_delay'] + self.pacing['max_delay']) / 2
+        seconds = remaining * cycle
+        limit = self.pacing.get('max_per_hour')
+        if limit:
+            seconds = max(seconds, remaining / limit * 3600)
+        return seconds
+
+    def eta(self):
+        """Projected completion time in epoch seconds (None if unknown)"""
+        seconds = self.projected_seconds()
+        return None if seconds is None else self.clock() + seconds
@@ -0,0 +1,133 @@
+"""
+SELECTOR RESOLVER - races every locator strategy in a single poll
+"""
+
+import json
+import os
+import time
+
+# Evaluates every strategy in one round trip and returns [name, element]
+# for the first one that matches, or null when none does yet.
+RACE_SCRIPT = """
+const strategies = arguments[0];
+for (const [name, kind, selector, index] of strategies) {
+    let nodes = [];
+    if (kind === 'css') {
+        nodes = document.querySelectorAll(selector);
+    } else {
+        const result = document.evaluate(selector, document, null,
+            XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < result.snapshotLength; i++) {
+            nodes.push(result.snapshotItem(i));
+        }
+    }
+    if (nodes.length > index) {
+        return [name, nodes[index]];
+    }
+}
+return null;
+"""
+
+# Message input box candidates: (name, 'css' | 'xpath', selector, match index)
+COMPOSE_BOX_STRATEGIES = [
+    # WhatsApp Web uses data-tab='10' for message input
+    ('data-tab', 'css',
+     "div[contenteditable='true'][data-tab='10'], "
+     "div[contenteditable='true'][data-tab='9'], "
+     "footer div[contenteditable='true']", 0),
+    ('footer', 'xpath', "//footer//div[@contenteditable='true']", 0),
+    ('absolute-xpath', 'xpath',
+     "/html/body/div[1]/div/div/div[3]/div/div[4]/div/footer/div[1]/div/span/div/div[2]/div[1]/div[2]/div[1]/p", 0),
+    # Last resort - usually [0] = search box, [1] = message box
+    ('second-editable', 'css', "div[contenteditable='true']", 1),
+]
+
+# Strategies that can match the wrong element (here: any second editable,
+# e.g. a caption box) - they stay last and are never learned as preferred
+FALLBACK_STRATEGIES = {'second-editable'}
+
+
+class SelectorResolver:
+    """Resolve elements by racing all strategies, remembering which one won"""
+
+    def __init__(self, driver, cache_file=None):
+        self.driver = driver
+        self.cache_file = cache_file
+        # target -> {"preferred": name, "wins": {name: count}}
+        self.cache = {}
+        # target -> {"hits": n, "misses": n, "failures": n} for this run
+        self.stats = {}
+        # Last resolve() - strategies in the order tried and the winner (diagnostics)
+        self.last = None
+        self.load()
+
+    def load(self):
+        """Load learned strategy order from disk (ignored if missing/corrupt)"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def save(self):
+        """Persist the learned strategy order for the next run"""
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.cache, f, indent=4)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"⚠️ Could not save selector cache: {e}")
+
+    def ordered(self, target, strategies):
+        """Strategies with the last winner for this target moved to the front"""
+        preferred = self.cache.get(target, {}).get('preferred')
+        if preferred in FALLBACK_STRATEGIES:
+            preferred = None  # learned by an older version
+        return sorted(strategies, key=lambda s: s[0] != preferred)
+
+    def resolve(self, target, strategies, timeout):
+        """Return (strategy_name, element) for the first strategy that matches"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        ordered = self.ordered(target, strategies)
+        stats = self.stats.setdefault(target, {'hits': 0, 'misses': 0, 'failures': 0})
+        payload = [list(s) for s in ordered]
+        self.last = {'target': target, 'tried': [s[0] for s in ordered], 'matched': None}
+        started = time.time()
+
+        try:
+            name, element = WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script(RACE_SCRIPT, payload),
+                f"No strategy matched for {target}")
+        except Exception:
+            stats['failures'] += 1
+            self.last['seconds'] = round(time.time() - started, 3)
+            raise
+        self.last['matched'] = name
+        self.last['seconds'] = round(time.time() - started, 3)
+
+        entry = self.cache.setdefault(target, {'preferred': None, 'wins': {}})
+        entry['wins'][name] = entry['wins'].get(name, 0) + 1
+        if name == entry['preferred']:
+            stats['hits'] += 1
+        elif name in FALLBACK_STRATEGIES:
+            stats['misses'] += 1
+        else:
+            # DOM drifted (or first run) - learn the new winner right away
+            stats['misses'] += 1
+            entry['preferred'] = name
+            self.save()
+        return name, element
+
+    def report(self):
+        """One line per target with this run's hit/miss counts"""
+        lines = []
+        for target, stats in self.stats.items():
+            preferred = self.cache.get(target, {}).get('preferred')
+            lines.append(f"{target}: {stats['hits']} hits, {stats['misses']} misses, "
+                         f"{stats['failures']} failures (preferred: {preferred})")
+        return lines
@@ -0,0 +1,68 @@
+"""
+STARTUP PROFILE - cold import time of the entry points, per module
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+# Modules that should only be imported once they are needed
+HEAVY_MODULES = ['pandas', 'numpy', 'selenium', 'pyarrow', 'openpyxl', 'psutil']
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module):
+    """Import `module` in a fresh interpreter with -X importtime.
+
+    Returns {'module', 'wall_ms', 'total_ms', 'modules', 'heavy', 'error'}.
+    total_ms is the time spent importing `module` itself; modules holds
+    (name, self_ms, cumulative_ms, depth) for every import, depth 0 being
+    imported directly (by interpreter start-up or `module`).
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    modules = []
+    error = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            if line.strip():
+                error = line.strip()  # the last traceback line is the exception
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(parts[0]) / 1000, int(parts[1]) / 1000, depth))
+    loaded = {name.split(".")[0] for name, _, _, _ in modules}
+    return {
+        'module': module,
+        'wall_ms': wall_ms,
+        'total_ms': next((cumulative_ms for name, _, cumulative_ms, _ in modules if name == module),
+                         sum(self_ms for _, self_ms, _, _ in modules)),
+        'modules': modules,
+        'heavy': [name for name in HEAVY_MODULES if name in loaded],
+        'error': error if result.returncode else None,
+    }
+
+
+def print_import_profile(profile, top=15):
+    print(f"\n{profile['module']}: {profile['total_ms']:.0f} ms to import, "
+          f"{profile['wall_ms']:.0f} ms interpreter start to exit")
+    if profile['error']:
+        print(f"  ✗ Import failed: {profile['error']}")
+    print(f"  Heavy modules loaded at import: {', '.join(profile['heavy']) or 'none'}")
+    print(f"  {'module':<44}{'self ms':>10}{'cumul ms':>10}")
+    # Top-level packages by cumulative time (their own imports are included)
+    roots = {}
+    for name, self_ms, cumulative_ms, depth in profile['modules']:
+        root = name.split(".")[0]
+        if root not in roots or cumulative_ms > roots[root][1]:
+            roots[root] = (self_ms, cumulative_ms)
+    ranked = sorted(roots.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_ms, cumulative_ms) in ranked[:top]:
+        print(f"  {name:<44}{self_ms:>10.1f}{cumulative_ms:>10.1f}")
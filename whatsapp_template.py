@@ -0,0 +1,70 @@
+"""
+MESSAGE TEMPLATE - parsed once, rendered for all rows at a time
+"""
+
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{([^{}\n]+)\}")
+
+
+def column_as_text(series):
+    """Column values as message text (missing values become empty strings)"""
+    return series.astype(object).where(series.notna(), "").astype(str)
+
+
+class MessageTemplate:
+    """A message template compiled into literal text and column placeholders"""
+
+    def __init__(self, template, columns, selected_vars=(), phone_column=None):
+        self.template = template
+        columns = list(columns)
+        selected = [v for v in selected_vars if v in columns and v != phone_column]
+
+        # Only selected variables and the phone column are substituted,
+        # any other {Name} is sent exactly as written
+        substituted = set(selected)
+        if phone_column in columns:
+            substituted.add(phone_column)
+
+        # segments: list of (is_column, text_or_column_name)
+        self.segments = []
+        self.placeholders = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            name = match.group(1)
+            if name not in self.placeholders:
+                self.placeholders.append(name)
+            if name not in substituted:
+                continue
+            if match.start() > position:
+                self.segments.append((False, template[position:match.start()]))
+            self.segments.append((True, name))
+            position = match.end()
+        if position < len(template):
+            self.segments.append((False, template[position:]))
+
+        self.fields = [name for is_column, name in self.segments if is_column]
+        self.unknown = [p for p in self.placeholders if p not in columns]
+        self.unselected = [p for p in self.placeholders
+                           if p in columns and p not in substituted]
+        self.unused = [v for v in selected if v not in self.placeholders]
+
+    def warnings(self):
+        """Human readable problems to show before the browser starts"""
+        problems = []
+        for name in self.unknown:
+            problems.append(f"{{{name}}} has no matching column - it will be sent as written")
+        for name in self.unselected:
+            problems.append(f"{{{name}}} is a column but not selected as a variable - it will be sent as written")
+        for name in self.unused:
+            problems.append(f"Variable '{name}' is selected but not used in the message")
+        return problems
+
+    def render_frame(self, df):
+        """Render every row of df at once, returns a Series aligned with df.index"""
+        import pandas as pd
+        rendered = pd.Series("", index=df.index, dtype=object)
+        texts = {name: column_as_text(df[name]) for name in set(self.fields)}
+        for is_column, text in self.segments:
+            rendered = rendered + (texts[text] if is_column else text)
+        return rendered
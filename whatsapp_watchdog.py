@@ -0,0 +1,160 @@
+"""
+WATCHDOG - browser memory / send latency sampling and session recycling
+"""
+
+from collections import deque
+from statistics import median
+
+DEFAULT_WATCHDOG = {
+    'check_every': 25,        # contacts between health samples
+    'max_heap_mb': 600,       # JS heap in use (DevTools Performance.getMetrics)
+    'max_dom_nodes': None,    # DOM nodes in the WhatsApp page
+    'max_rss_mb': None,       # resident memory of all Chrome processes (needs psutil)
+    'latency_window': 20,     # sends in the baseline and in the recent window
+    'latency_factor': 2.0,    # recycle when recent median send time > factor x baseline
+    'recycle_every': None,    # also recycle unconditionally every N contacts
+}
+
+# Sample keys checked against the thresholds above
+LIMITS = [
+    ('js_heap_mb', 'max_heap_mb', "JS heap {value:.0f} MB > {limit} MB"),
+    ('dom_nodes', 'max_dom_nodes', "{value} DOM nodes > {limit}"),
+    ('rss_mb', 'max_rss_mb', "Chrome memory {value:.0f} MB > {limit} MB"),
+]
+
+
+class Watchdog:
+    """Watches the browser between contacts and recycles it before it degrades.
+
+    A "tab" recycle reopens WhatsApp Web in a fresh tab (new renderer, same
+    login); a "driver" recycle restarts Chrome with the same profile. Both
+    happen between two contacts, so the campaign continues with the next row.
+    """
+
+    def __init__(self, backend, metrics, settings=None):
+        self.backend = backend
+        self.metrics = metrics
+        self.settings = dict(DEFAULT_WATCHDOG)
+        self.settings.update(settings or {})
+        window = self.settings['latency_window']
+        self.baseline = []                      # first `window` send times
+        self.recent = deque(maxlen=window)      # latest send times
+        self.latency_recycled = False           # last recycle was for slow sends
+        # Reload navigation is slower than in-app switching; a change of mode
+        # starts a new baseline instead of looking like a degraded browser
+        self.navigation = getattr(backend, 'in_app_navigation', None)
+        self.since_check = 0
+        self.since_recycle = 0
+        self.last_failed = False
+        self.last_sample = {}
+        self.recycles = []                      # (level, reason, ok)
+
+    def record_send(self, seconds, ok):
+        """Called after every attempt with its duration"""
+        navigation = getattr(self.backend, 'in_app_navigation', None)
+        if navigation != self.navigation:
+            # This attempt paid for the failed switch; leave it out of both windows
+            self.navigation = navigation
+            self.reset_latency()
+        elif ok:
+            if len(self.baseline) < self.settings['latency_window']:
+                self.baseline.append(seconds)
+            self.recent.append(seconds)
+        self.last_failed = not ok
+        self.since_check += 1
+        self.since_recycle += 1
+
+    def latency_problem(self):
+        window = self.settings['latency_window']
+        factor = self.settings.get('latency_factor')
+        if not factor or len(self.baseline) < window or len(self.recent) < window:
+            return None
+        base, now = median(self.baseline), median(self.recent)
+        if not (base > 0 and now > factor * base):
+            self.latency_recycled = False
+            return None
+        if self.latency_recycled:
+            # Recycling did not help, so the browser is not what got slower
+            # (network, WhatsApp itself): measure against the new normal
+            print(f"  ↻ Send time still {now:.1f}s after recycling - using it as the new baseline")
+            self.reset_latency(list(self.recent))
+            return None
+        self.latency_recycled = True
+        return f"send time {now:.1f}s > {factor} x baseline {base:.1f}s"
+
+    def reset_latency(self, baseline=None):
+        """Start the latency comparison over, from `baseline` if given"""
+        self.baseline = baseline or []
+        self.recent.clear()
+        self.latency_recycled = False
+
+    def sample(self):
+        """Read browser health and emit it as a 'health' event"""
+        self.since_check = 0
+        try:
+            sample = self.backend.health() or {}
+        except Exception:
+            sample = {}
+        if self.recent:
+            sample['send_seconds_p50'] = round(median(self.recent), 3)
+        self.last_sample = sample
+        self.metrics.event('health', **sample)
+        return sample
+
+    def problem(self):
+        """Reason to recycle the tab now, or None"""
+        every = self.settings.get('recycle_every')
+        if every and self.since_recycle >= every:
+            return f"scheduled recycle after {self.since_recycle} contacts"
+        if self.since_check < self.settings['check_every']:
+            return None
+        sample = self.sample()
+        for key, setting, message in LIMITS:
+            limit = self.settings.get(setting)
+            value = sample.get(key)
+            if limit and value is not None and value > limit:
+                return message.format(value=value, limit=limit)
+        return self.latency_problem()
+
+    def ensure_healthy(self):
+        """Check between contacts; False only when the browser cannot be recovered"""
+        if self.last_failed and not self.backend.is_alive():
+            return self.recycle('driver', "browser session lost")
+        reason = self.problem()
+        if reason:
+            return self.recycle('tab', reason)
+        return True
+
+    def recover_if_lost(self):
+        """After a failed send: restart a dead browser; True if it was restarted"""
+        if self.backend.is_alive():
+            return False
+        return self.recycle('driver', "browser session lost during send")
+
+    def recycle(self, level, reason):
+        """Recycle the tab (falling back to the driver); True when usable again"""
+        print(f"\n  ♻️ Recycling browser {level}: {reason}")
+        with self.metrics.stage('recycle', level=level, reason=reason):
+            ok = self.backend.recycle(level)
+            if not ok and level == 'tab':
+                level = 'driver'
+                print("  ♻️ Tab recycle failed - restarting Chrome")
+                ok = self.backend.recycle(level)
+        self.recycles.append((level, reason, ok))
+        self.metrics.event('recycle', level=level, reason=reason, ok=ok)
+        if ok:
+            print(f"  ✓ Browser {level} recycled - continuing")
+            self.recent.clear()
+            self.since_recycle = 0
+            self.since_check = 0
+            self.last_failed = False
+        return ok
+
+    def report(self):
+        """Summary lines for the end of the run"""
+        if not self.recycles:
+            return []
+        lines = [f"Watchdog: {len(self.recycles)} recycle(s)"]
+        for level, reason, ok in self.recycles:
+            lines.append(f"  {'✓' if ok else '✗'} {level}: {reason}")
+        return lines